@@ -4,12 +4,201 @@ Fetch and process Non-Commercial speculative positioning
 """
 import pandas as pd
 import numpy as np
+import os
 from pathlib import Path
 from datetime import datetime
 import requests
-from io import BytesIO
+import json
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
 from zipfile import ZipFile
 
+# Disk cache for annual CFTC ZIPs (raw ZIP + parsed EUR slice per report file)
+CACHE_DIR = Path(__file__).parent.parent / 'cftc_outputs' / '_cache'
+
+# Report columns consumed by the positioning processors
+CFTC_COLUMNS = (
+    'Market_and_Exchange_Names',
+    'Report_Date_as_YYYY-MM-DD',
+    'NonComm_Positions_Long_All',
+    'NonComm_Positions_Short_All',
+)
+
+# Bumped whenever the parsed slice's column set changes (old slices re-parse)
+SLICE_VERSION = 2
+
+def _keep_cftc_column(column):
+    """Known report column, or any Non-Commercial long/short position column"""
+    # Report variants name the position columns differently, so every
+    # NonComm long/short candidate is kept for the processors' fallback scan
+    return column in CFTC_COLUMNS or ('NonComm' in column and ('Long' in column or 'Short' in column))
+
+# Year downloads run in worker threads - keep each year's log lines together
+_print_lock = threading.Lock()
+
+def log_block(*lines):
+    """Print a block of lines atomically (safe to call from worker threads)"""
+    with _print_lock:
+        for line in lines:
+            print(line)
+
+def make_cftc_session(pool_size=8):
+    """
+    Create a requests.Session with a keep-alive connection pool
+    
+    All annual ZIPs live on the same host, so one pooled session lets the
+    parallel year fetches reuse TCP+TLS connections instead of paying a
+    fresh handshake per year. HTTP/2 multiplexing (httpx) is not worth an
+    extra dependency here: with the disk cache a steady-state run issues a
+    single conditional GET for the current year.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    return session
+
+def _find_report_file(zf, year):
+    """Locate the report .txt inside an annual CFTC ZIP"""
+    # List all files in zip to find the right one
+    file_list = zf.namelist()
+    
+    # Try common naming patterns
+    possible_names = [
+        f"FinFutYY{str(year)[-2:]}.txt",
+        f"annual.txt",
+        f"f_year.txt",
+        # CFTC uses 'annual.txt' for current year historical data
+    ]
+    
+    for name in possible_names:
+        if name in file_list:
+            return name
+    
+    # If still not found, use first .txt file
+    txt_files = [f for f in file_list if f.endswith('.txt')]
+    if txt_files:
+        return txt_files[0]
+    raise ValueError(f"No .txt file found in zip. Files: {file_list}")
+
+def _parse_cftc_zip(zip_path, year, market_filter):
+    """
+    Parse a cached annual ZIP and keep only rows for the requested market
+    
+    Only the columns used downstream (the fixed report columns plus every
+    Non-Commercial long/short candidate) are materialized, and the market
+    filter is applied chunk by chunk so the full multi-hundred-column
+    report is never held in memory at once.
+    """
+    with ZipFile(zip_path) as zf:
+        with zf.open(_find_report_file(zf, year)) as f:
+            chunks = pd.read_csv(f, usecols=_keep_cftc_column, chunksize=50_000)
+            df_year = pd.concat(
+                [chunk[chunk['Market_and_Exchange_Names'].str.contains(market_filter, case=False, na=False, regex=False)]
+                 for chunk in chunks],
+                ignore_index=True
+            )
+    
+    return df_year
+
+def fetch_cftc_year(url, year, market_filter='EURO FX', cache_dir=CACHE_DIR, session=None):
+    """
+    Fetch one annual CFTC report through a 2-level disk cache
+    
+    Level 1 is the raw ZIP, level 2 the parsed slice for `market_filter`
+    (parquet). Completed years never change, so a year cached after it
+    ended is served from disk without any HTTP call. The current year (and
+    a past year cached while it was still running) is revalidated with a
+    conditional GET (If-Modified-Since / If-None-Match) and only
+    re-downloaded when CFTC has published a new file.
+    
+    Parameters:
+    - url: annual ZIP URL on cftc.gov
+    - year: report year (decides whether the cache can be trusted as final)
+    - market_filter: substring matched against Market_and_Exchange_Names
+    - cache_dir: cache directory (defaults to cftc_outputs/_cache)
+    - session: optional pooled requests.Session (see make_cftc_session)
+    
+    Returns:
+    - DataFrame with the filtered rows for that year
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    stem = Path(url).stem
+    market_tag = market_filter.lower().replace(' ', '_')
+    zip_path = cache_dir / f"{stem}.zip"
+    parquet_path = cache_dir / f"{stem}_{market_tag}_v{SLICE_VERSION}.parquet"
+    meta_path = cache_dir / f"{stem}_meta.json"
+    
+    def _from_cache():
+        if parquet_path.exists():
+            return pd.read_parquet(parquet_path)
+        df_cached = _parse_cftc_zip(zip_path, year, market_filter)
+        df_cached.to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+        return df_cached
+    
+    meta = {}
+    if meta_path.exists():
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+    
+    def _write_meta(last_modified, etag):
+        with open(meta_path, 'w') as f:
+            json.dump({
+                'url': url,
+                'last_modified': last_modified,
+                'etag': etag,
+                'cached_at': datetime.now().isoformat()
+            }, f, indent=2)
+    
+    # A past year is final only if it was cached after that year ended - a
+    # copy taken while the year was still running misses its last reports,
+    # so it is revalidated below like the current year
+    cached_at = meta.get('cached_at')
+    if (year < datetime.now().year
+            and (parquet_path.exists() or zip_path.exists())
+            and cached_at and datetime.fromisoformat(cached_at).year > year):
+        return _from_cache()
+    
+    # Current (or not yet final) year: conditional GET against the cached validators
+    headers = {}
+    if zip_path.exists():
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+    
+    http = session if session is not None else requests
+    with http.get(url, headers=headers, timeout=30, stream=True) as response:
+        if response.status_code == 304:
+            log_block(f"  {stem}: not modified, using cache")
+            # Re-stamp so a past year confirmed unchanged becomes final
+            _write_meta(meta.get('last_modified'), meta.get('etag'))
+            return _from_cache()
+        response.raise_for_status()
+        
+        # Stream to a temp file (~1 MB in memory) and swap it in once complete,
+        # so an interrupted download never leaves a truncated ZIP in the cache
+        tmp_path = zip_path.with_suffix('.zip.part')
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+            os.replace(tmp_path, zip_path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        
+        _write_meta(response.headers.get('Last-Modified'), response.headers.get('ETag'))
+    
+    # New ZIP invalidates every parsed slice derived from it
+    for stale in cache_dir.glob(f"{stem}_*.parquet"):
+        stale.unlink()
+    
+    return _from_cache()
+
 def fetch_cftc_data(years=None):
     """
     Fetch CFTC Commitments of Traders data for EUR FX futures
@@ -24,63 +213,30 @@ def fetch_cftc_data(years=None):
         current_year = datetime.now().year
         years = list(range(current_year - 4, current_year + 1))
     
-    all_data = []
+    session = make_cftc_session()
     
-    for year in years:
+    def _fetch_one(year):
+        # CFTC publishes financial futures data as annual zip files
+        url = f"https://www.cftc.gov/files/dea/history/fut_fin_txt_{year}.zip"
         try:
-            # CFTC publishes financial futures data as annual zip files
-            url = f"https://www.cftc.gov/files/dea/history/fut_fin_txt_{year}.zip"
-            print(f"Fetching {year}...")
-            
-            response = requests.get(url, timeout=30)
-            response.raise_for_status()
-            
-            # Extract CSV from zip
-            with ZipFile(BytesIO(response.content)) as zf:
-                # List all files in zip to find the right one
-                file_list = zf.namelist()
-                
-                # Try common naming patterns
-                possible_names = [
-                    f"FinFutYY{str(year)[-2:]}.txt",
-                    f"annual.txt",
-                    f"f_year.txt",
-                    # CFTC uses 'annual.txt' for current year historical data
-                ]
-                
-                csv_name = None
-                for name in possible_names:
-                    if name in file_list:
-                        csv_name = name
-                        break
-                
-                # If still not found, use first .txt file
-                if csv_name is None:
-                    txt_files = [f for f in file_list if f.endswith('.txt')]
-                    if txt_files:
-                        csv_name = txt_files[0]
-                    else:
-                        raise ValueError(f"No .txt file found in zip. Files: {file_list}")
-                
-                with zf.open(csv_name) as f:
-                    df_year = pd.read_csv(f)
-                    all_data.append(df_year)
-            
-            print(f"  ✓ {len(df_year)} records")
-            
+            df_year = fetch_cftc_year(url, year, market_filter='EURO FX', session=session)
+            log_block(f"Fetching {year}...", f"  ✓ {len(df_year)} records")
+            return df_year
         except Exception as e:
-            print(f"  ✗ Failed to fetch {year}: {e}")
-            continue
+            log_block(f"Fetching {year}...", f"  ✗ Failed to fetch {year}: {e}")
+            return None
+    
+    # Downloads are I/O bound - overlap them across years
+    with session, ThreadPoolExecutor(max_workers=max(1, min(len(years), 6))) as ex:
+        results = list(ex.map(_fetch_one, years))
+    
+    all_data = [df_year for df_year in results if df_year is not None]
     
     if not all_data:
         raise ValueError("No CFTC data fetched")
     
-    # Combine all years
-    df = pd.concat(all_data, ignore_index=True)
-    
-    # Filter for EUR FX
-    euro_mask = df['Market_and_Exchange_Names'].str.contains('EURO FX', case=False, na=False)
-    df_euro = df[euro_mask].copy()
+    # Combine all years (already filtered to EUR FX per year)
+    df_euro = pd.concat(all_data, ignore_index=True)
     
     if df_euro.empty:
         raise ValueError("No EUR FX data found in CFTC reports")
@@ -89,6 +245,96 @@ def fetch_cftc_data(years=None):
     
     return df_euro
 
+def rolling_mean_std_z(x, window, min_periods):
+    """
+    Rolling mean, sample std (ddof=1) and z-score from one pass of running sums
+    
+    The series is centred on its overall mean before accumulating sum and
+    sum-of-squares so the variance does not lose precision to cancellation.
+    
+    Parameters:
+    - x: 1-D array of observations (no NaNs)
+    - window: rolling window length
+    - min_periods: minimum observations required for a value
+    
+    Returns:
+    - (mean, std, z) float64 arrays, NaN where fewer than min_periods obs
+    """
+    x = np.asarray(x, dtype=np.float64)
+    shift = x.mean() if x.size else 0.0
+    xc = x - shift
+    csum = np.concatenate(([0.0], np.cumsum(xc)))
+    csum_sq = np.concatenate(([0.0], np.cumsum(xc * xc)))
+    
+    end = np.arange(1, x.size + 1)
+    start = np.maximum(end - window, 0)
+    n = end - start
+    s1 = csum[end] - csum[start]
+    s2 = csum_sq[end] - csum_sq[start]
+    
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_c = s1 / n
+        var = np.maximum(s2 - s1 * mean_c, 0.0) / (n - 1)
+        mean = mean_c + shift
+        std = np.sqrt(var)
+        short = n < min_periods
+        mean[short] = np.nan
+        std[short] = np.nan
+        z = (x - mean) / std
+    
+    return mean, std, z
+
+def percentile_rank(x):
+    """
+    Percentile rank (0-100] of every element, ties averaged
+    
+    Same result as Series.rank(pct=True) * 100 for NaN-free input, from one
+    sort and two binary searches.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    sorted_x = np.sort(x)
+    lo = np.searchsorted(sorted_x, x, side='left')
+    hi = np.searchsorted(sorted_x, x, side='right')
+    return (lo + hi + 1) / 2 / x.size * 100
+
+def positioning_stats(net):
+    """
+    Rolling z-scores, historical percentile and crowding state for net positions
+    
+    Parameters:
+    - net: date-sorted net position array (no NaNs)
+    
+    Returns:
+    - dict of column name -> array, ready for DataFrame.assign
+    """
+    # 6-month window (~26 weeks)
+    mean_6m, std_6m, z_6m = rolling_mean_std_z(net, window=26, min_periods=20)
+    
+    # 1-year window (~52 weeks)
+    mean_1y, std_1y, z_1y = rolling_mean_std_z(net, window=52, min_periods=40)
+    
+    # Historical percentile (full history)
+    pct = percentile_rank(net)
+    
+    # Classification (vectorized over all rows)
+    conditions = [
+        np.isnan(z_1y) | np.isnan(pct),
+        (z_1y > 1.5) | (pct > 85),
+        (z_1y < -1.5) | (pct < 15),
+    ]
+    choices = ["Unknown", "Crowded Long", "Crowded Short"]
+    
+    return {
+        'mean_6m': mean_6m,
+        'std_6m': std_6m,
+        'z_6m': z_6m,
+        'mean_1y': mean_1y,
+        'std_1y': std_1y,
+        'z_1y': z_1y,
+        'percentile': pct,
+        'positioning_state': np.select(conditions, choices, default="Neutral"),
+    }
+
 def process_cftc_positioning(df_raw):
     """
     Process CFTC data to extract Non-Commercial positioning
@@ -96,14 +342,13 @@ def process_cftc_positioning(df_raw):
     Returns:
     - DataFrame with date, long, short, net, z-scores, percentile
     """
-    df = df_raw.copy()
-    
-    # Parse date
-    df['date'] = pd.to_datetime(df['Report_Date_as_YYYY-MM-DD'])
-    
-    # Extract Non-Commercial (speculative) positions
-    df['long'] = pd.to_numeric(df['NonComm_Positions_Long_All'], errors='coerce')
-    df['short'] = pd.to_numeric(df['NonComm_Positions_Short_All'], errors='coerce')
+    # Build the working frame from the columns used (no copy of the raw report)
+    # Non-Commercial = speculative positions
+    df = pd.DataFrame({
+        'date': pd.to_datetime(df_raw['Report_Date_as_YYYY-MM-DD']),
+        'long': pd.to_numeric(df_raw['NonComm_Positions_Long_All'], errors='coerce'),
+        'short': pd.to_numeric(df_raw['NonComm_Positions_Short_All'], errors='coerce'),
+    })
     
     # Calculate net position
     df['net_position'] = df['long'] - df['short']
@@ -111,41 +356,11 @@ def process_cftc_positioning(df_raw):
     # Sort by date
     df = df.sort_values('date').reset_index(drop=True)
     
-    # Keep only relevant columns
-    df_clean = df[['date', 'long', 'short', 'net_position']].copy()
-    
     # Remove any rows with missing data
-    df_clean = df_clean.dropna()
+    df_clean = df.dropna()
     
-    # Calculate rolling statistics
-    # 6-month window (~26 weeks)
-    df_clean['mean_6m'] = df_clean['net_position'].rolling(window=26, min_periods=20).mean()
-    df_clean['std_6m'] = df_clean['net_position'].rolling(window=26, min_periods=20).std()
-    df_clean['z_6m'] = (df_clean['net_position'] - df_clean['mean_6m']) / df_clean['std_6m']
-    
-    # 1-year window (~52 weeks)
-    df_clean['mean_1y'] = df_clean['net_position'].rolling(window=52, min_periods=40).mean()
-    df_clean['std_1y'] = df_clean['net_position'].rolling(window=52, min_periods=40).std()
-    df_clean['z_1y'] = (df_clean['net_position'] - df_clean['mean_1y']) / df_clean['std_1y']
-    
-    # Historical percentile (full history)
-    df_clean['percentile'] = df_clean['net_position'].rank(pct=True) * 100
-    
-    # Classification
-    def classify_positioning(row):
-        z = row['z_1y']
-        pct = row['percentile']
-        
-        if pd.isna(z) or pd.isna(pct):
-            return "Unknown"
-        elif z > 1.5 or pct > 85:
-            return "Crowded Long"
-        elif z < -1.5 or pct < 15:
-            return "Crowded Short"
-        else:
-            return "Neutral"
-    
-    df_clean['positioning_state'] = df_clean.apply(classify_positioning, axis=1)
+    # Rolling stats, percentile and state - attached in one step
+    df_clean = df_clean.assign(**positioning_stats(df_clean['net_position'].to_numpy()))
     
     return df_clean
 
@@ -168,6 +383,15 @@ def generate_positioning_commentary(state, z_6m, z_1y, percentile):
     else:
         return "Positioning is neutral, suggesting limited crowding-related asymmetry."
 
+def write_positioning_csv(df, csv_path):
+    """
+    Write the processed positioning frame as CSV with Arrow's C writer
+    
+    Report dates are written as plain dates (YYYY-MM-DD), as before.
+    """
+    table = pa.Table.from_pandas(df.assign(date=df['date'].dt.date), preserve_index=False)
+    pa_csv.write_csv(table, str(csv_path))
+
 def save_positioning_data(output_dir='cftc_outputs'):
     """
     Fetch, process, and save CFTC positioning data
@@ -215,9 +439,8 @@ def save_positioning_data(output_dir='cftc_outputs'):
     csv_path = output_path / 'cftc_eur_positioning.csv'
     json_path = output_path / 'cftc_positioning_summary.json'
     
-    df_processed.to_csv(csv_path, index=False)
+    write_positioning_csv(df_processed, csv_path)
     
-    import json
     with open(json_path, 'w') as f:
         json.dump(summary, f, indent=2)
     
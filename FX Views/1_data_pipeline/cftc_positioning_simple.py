@@ -4,9 +4,26 @@ Using direct CSV download from CFTC
 """
 import pandas as pd
 import numpy as np
+import sys
 from pathlib import Path
 from datetime import datetime
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+# Share the disk-cached annual ZIP fetcher with the full pipeline
+sys.path.insert(0, str(Path(__file__).parent))
+from cftc_positioning_data import fetch_cftc_year, make_cftc_session, log_block, positioning_stats, write_positioning_csv
+
+# Usual Non-Commercial column names - checked before scanning every column
+LONG_CANDIDATES = ('NonComm_Positions_Long_All',)
+SHORT_CANDIDATES = ('NonComm_Positions_Short_All',)
+
+def _find_column(columns, candidates, side):
+    """Known column name if present, else the first NonComm/<side>/All column (or None)"""
+    found = next((c for c in candidates if c in columns), None)
+    if found is None:
+        found = next((c for c in columns if 'NonComm' in c and side in c and 'All' in c), None)
+    return found
 
 def fetch_cftc_data_direct():
     """
@@ -20,44 +37,49 @@ def fetch_cftc_data_direct():
     # Try multiple years and combine
     base_url = "https://www.cftc.gov/files/dea/history"
     
-    all_data = []
+    session = make_cftc_session()
     
-    # Try years from 2020-2025
-    for year in range(2020, 2026):
+    def _fetch_one(year):
+        lines = []
         try:
             # Financial Futures - Disaggregated format (better for EUR)
             url = f"{base_url}/dea_fut_txt_{year}.zip"
-            print(f"\nTrying {year} (Disaggregated)...")
-            df_year = pd.read_csv(url, compression='zip', low_memory=False)
+            lines.append(f"\nTrying {year} (Disaggregated)...")
             
-            # Filter for EURO
-            euro_mask = df_year['Market_and_Exchange_Names'].str.contains('EURO', case=False, na=False)
-            df_euro_year = df_year[euro_mask]
+            # Filter for EURO (applied inside the cached fetch)
+            df_euro_year = fetch_cftc_year(url, year, market_filter='EURO', session=session)
             
             if not df_euro_year.empty:
-                all_data.append(df_euro_year)
-                print(f"  ✓ {len(df_euro_year)} EUR records")
-            else:
-                print(f"  ✗ No EUR data")
+                lines.append(f"  ✓ {len(df_euro_year)} EUR records")
+                return df_euro_year
+            lines.append(f"  ✗ No EUR data")
+            return None
         
         except Exception as e:
-            print(f"  ✗ Failed: {str(e)[:100]}")
+            lines.append(f"  ✗ Failed: {str(e)[:100]}")
             
             # Try Legacy format as backup
             try:
                 url_legacy = f"{base_url}/fut_fin_txt_{year}.zip"
-                print(f"  Trying Legacy format...")
-                df_year = pd.read_csv(url_legacy, compression='zip', low_memory=False)
-                
-                euro_mask = df_year['Market_and_Exchange_Names'].str.contains('EURO', case=False, na=False)
-                df_euro_year = df_year[euro_mask]
+                lines.append(f"  Trying Legacy format...")
+                df_euro_year = fetch_cftc_year(url_legacy, year, market_filter='EURO', session=session)
                 
                 if not df_euro_year.empty:
-                    all_data.append(df_euro_year)
-                    print(f"  ✓ {len(df_euro_year)} EUR records (Legacy)")
+                    lines.append(f"  ✓ {len(df_euro_year)} EUR records (Legacy)")
+                    return df_euro_year
+                return None
             except Exception as e2:
-                print(f"  ✗ Legacy also failed: {str(e2)[:100]}")
-                continue
+                lines.append(f"  ✗ Legacy also failed: {str(e2)[:100]}")
+                return None
+        finally:
+            log_block(*lines)
+    
+    # Try years from 2020-2025 (downloads overlap on one pooled session)
+    years = list(range(2020, 2026))
+    with session, ThreadPoolExecutor(max_workers=len(years)) as ex:
+        results = list(ex.map(_fetch_one, years))
+    
+    all_data = [df for df in results if df is not None]
     
     if not all_data:
         raise ValueError("Could not fetch any CFTC data")
@@ -70,34 +92,30 @@ def fetch_cftc_data_direct():
 def process_positioning(df_raw):
     """Process CFTC data to get Non-Commercial positioning"""
     
-    df = df_raw.copy()
-    
-    # Parse date
-    df['date'] = pd.to_datetime(df['Report_Date_as_YYYY-MM-DD'])
-    
     # Try to get Non-Commercial positions (speculators)
     # Column names vary by report type
-    long_cols = [c for c in df.columns if 'NonComm' in c and 'Long' in c and 'All' in c]
-    short_cols = [c for c in df.columns if 'NonComm' in c and 'Short' in c and 'All' in c]
+    long_col = _find_column(df_raw.columns, LONG_CANDIDATES, 'Long')
+    short_col = _find_column(df_raw.columns, SHORT_CANDIDATES, 'Short')
     
-    if not long_cols or not short_cols:
-        print("Available columns:", df.columns.tolist())
+    if long_col is None or short_col is None:
+        print("Available columns:", df_raw.columns.tolist())
         raise ValueError("Could not find Non-Commercial position columns")
     
-    long_col = long_cols[0]
-    short_col = short_cols[0]
-    
     print(f"\nUsing columns:")
     print(f"  Long: {long_col}")
     print(f"  Short: {short_col}")
     
-    df['long'] = pd.to_numeric(df[long_col], errors='coerce')
-    df['short'] = pd.to_numeric(df[short_col], errors='coerce')
+    # Build the working frame from the columns used (no copy of the raw report)
+    df = pd.DataFrame({
+        'date': pd.to_datetime(df_raw['Report_Date_as_YYYY-MM-DD']),
+        'long': pd.to_numeric(df_raw[long_col], errors='coerce'),
+        'short': pd.to_numeric(df_raw[short_col], errors='coerce'),
+    })
     df['net_position'] = df['long'] - df['short']
     
     # Sort and clean
     df = df.sort_values('date').reset_index(drop=True)
-    df_clean = df[['date', 'long', 'short', 'net_position']].dropna()
+    df_clean = df.dropna()
     
     # Remove duplicates (keep most recent for each date)
     df_clean = df_clean.drop_duplicates(subset=['date'], keep='last')
@@ -105,35 +123,8 @@ def process_positioning(df_raw):
     print(f"\n✓ Clean records: {len(df_clean)}")
     print(f"  Date range: {df_clean['date'].min()} to {df_clean['date'].max()}")
     
-    # Calculate statistics
-    # 6-month window (~26 weeks)
-    df_clean['mean_6m'] = df_clean['net_position'].rolling(window=26, min_periods=20).mean()
-    df_clean['std_6m'] = df_clean['net_position'].rolling(window=26, min_periods=20).std()
-    df_clean['z_6m'] = (df_clean['net_position'] - df_clean['mean_6m']) / df_clean['std_6m']
-    
-    # 1-year window (~52 weeks)
-    df_clean['mean_1y'] = df_clean['net_position'].rolling(window=52, min_periods=40).mean()
-    df_clean['std_1y'] = df_clean['net_position'].rolling(window=52, min_periods=40).std()
-    df_clean['z_1y'] = (df_clean['net_position'] - df_clean['mean_1y']) / df_clean['std_1y']
-    
-    # Historical percentile
-    df_clean['percentile'] = df_clean['net_position'].rank(pct=True) * 100
-    
-    # Classification
-    def classify(row):
-        z = row['z_1y']
-        pct = row['percentile']
-        
-        if pd.isna(z) or pd.isna(pct):
-            return "Unknown"
-        elif z > 1.5 or pct > 85:
-            return "Crowded Long"
-        elif z < -1.5 or pct < 15:
-            return "Crowded Short"
-        else:
-            return "Neutral"
-    
-    df_clean['positioning_state'] = df_clean.apply(classify, axis=1)
+    # Rolling stats, percentile and state - attached in one step
+    df_clean = df_clean.assign(**positioning_stats(df_clean['net_position'].to_numpy()))
     
     return df_clean
 
@@ -182,7 +173,7 @@ if __name__ == '__main__':
         csv_path = output_dir / 'cftc_eur_positioning.csv'
         json_path = output_dir / 'cftc_positioning_summary.json'
         
-        df_processed.to_csv(csv_path, index=False)
+        write_positioning_csv(df_processed, csv_path)
         
         with open(json_path, 'w') as f:
             json.dump(summary, f, indent=2)
@@ -5,10 +5,34 @@ Creates candlestick chart with overlays and indicator panels
 import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
+import plotly.io as pio
 from plotly.subplots import make_subplots
 from pathlib import Path
 import json
 
+# Static dark-theme layout, built once and shared by every chart render.
+# Layered on a copy of the stock 'plotly' template so the default colorway,
+# axis grid / line styling and hoverlabel defaults are kept
+CHART_TEMPLATE = go.layout.Template(pio.templates['plotly'])
+CHART_TEMPLATE.layout.update(
+    height=1200,
+    plot_bgcolor='#1a1f2e',
+    paper_bgcolor='#0f1419',
+    font=dict(color='#FFFFFF', family='Arial', size=11),
+    showlegend=True,
+    legend=dict(
+        orientation="h",
+        yanchor="bottom",
+        y=1.02,
+        xanchor="right",
+        x=1,
+        bgcolor='rgba(26, 31, 46, 0.8)',
+        bordercolor='#3a4254',
+        borderwidth=1
+    ),
+    margin=dict(l=60, r=60, t=80, b=60)
+)
+
 def create_technical_chart(df, fib_levels, summary):
     """
     Create comprehensive technical chart with:
@@ -18,8 +42,15 @@ def create_technical_chart(df, fib_levels, summary):
     - Panel 4: Bollinger Width
     """
     
-    # Take last 180 days for visual clarity
-    df_chart = df.tail(180).copy()
+    # Take last 180 days for visual clarity (read-only slice, no copy needed)
+    df_chart = df.tail(180)
+    
+    # Plain ndarrays let Plotly serialise each trace in one pass
+    x = df_chart.index.values
+    col = {c: df_chart[c].to_numpy() for c in (
+        'Open', 'High', 'Low', 'Close', 'SMA_50', 'SMA_100', 'SMA_200',
+        'RSI', 'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_Width'
+    )}
     
     # Create subplots
     fig = make_subplots(
@@ -30,49 +61,126 @@ def create_technical_chart(df, fib_levels, summary):
         subplot_titles=('EURUSD Price & Key Levels', 'RSI (14)', 'MACD', 'Bollinger Width')
     )
     
+    # All traces are built up front and added in a single add_traces call
+    traces = []
+    rows = []
+    
     # =====================================================================
     # PANEL 1: CANDLESTICKS + MAs + FIB + LEVELS
     # =====================================================================
     
     # Candlesticks (primary visual)
-    fig.add_trace(go.Candlestick(
-        x=df_chart.index,
-        open=df_chart['Open'],
-        high=df_chart['High'],
-        low=df_chart['Low'],
-        close=df_chart['Close'],
+    traces.append(go.Candlestick(
+        x=x,
+        open=col['Open'],
+        high=col['High'],
+        low=col['Low'],
+        close=col['Close'],
         name='EURUSD',
         increasing=dict(line=dict(color='#00A676', width=1), fillcolor='rgba(0, 166, 118, 0.3)'),
         decreasing=dict(line=dict(color='#EF4444', width=1), fillcolor='rgba(239, 68, 68, 0.3)'),
-    ), row=1, col=1)
+    ))
+    rows.append(1)
     
     # Moving Averages (thin & muted)
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['SMA_50'],
+    traces.append(go.Scatter(
+        x=x,
+        y=col['SMA_50'],
         mode='lines',
         name='50d MA',
         line=dict(color='#3B82F6', width=1.5, dash='solid'),
         opacity=0.7
-    ), row=1, col=1)
+    ))
+    rows.append(1)
     
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['SMA_100'],
+    traces.append(go.Scatter(
+        x=x,
+        y=col['SMA_100'],
         mode='lines',
         name='100d MA',
         line=dict(color='#F59E0B', width=1.5, dash='dot'),
         opacity=0.7
-    ), row=1, col=1)
+    ))
+    rows.append(1)
     
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['SMA_200'],
+    traces.append(go.Scatter(
+        x=x,
+        y=col['SMA_200'],
         mode='lines',
         name='200d MA',
         line=dict(color='#8B5CF6', width=2, dash='solid'),
         opacity=0.8
-    ), row=1, col=1)
+    ))
+    rows.append(1)
+    
+    # =====================================================================
+    # PANEL 2: RSI
+    # =====================================================================
+    
+    traces.append(go.Scatter(
+        x=x,
+        y=col['RSI'],
+        mode='lines',
+        name='RSI',
+        line=dict(color='#00A676', width=2),
+    ))
+    rows.append(2)
+    
+    # =====================================================================
+    # PANEL 3: MACD
+    # =====================================================================
+    
+    # MACD line
+    traces.append(go.Scatter(
+        x=x,
+        y=col['MACD'],
+        mode='lines',
+        name='MACD',
+        line=dict(color='#3B82F6', width=2),
+    ))
+    rows.append(3)
+    
+    # Signal line
+    traces.append(go.Scatter(
+        x=x,
+        y=col['MACD_Signal'],
+        mode='lines',
+        name='Signal',
+        line=dict(color='#F59E0B', width=1.5),
+    ))
+    rows.append(3)
+    
+    # Histogram
+    colors = np.where(col['MACD_Hist'] >= 0, '#00A676', '#EF4444').tolist()
+    traces.append(go.Bar(
+        x=x,
+        y=col['MACD_Hist'],
+        name='Histogram',
+        marker_color=colors,
+        opacity=0.5
+    ))
+    rows.append(3)
+    
+    # =====================================================================
+    # PANEL 4: BOLLINGER WIDTH
+    # =====================================================================
+    
+    traces.append(go.Scatter(
+        x=x,
+        y=col['BB_Width'],
+        mode='lines',
+        name='BB Width',
+        line=dict(color='#8B5CF6', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(139, 92, 246, 0.2)'
+    ))
+    rows.append(4)
+    
+    fig.add_traces(traces, rows=rows, cols=[1] * len(traces))
+    
+    # =====================================================================
+    # REFERENCE LINES
+    # =====================================================================
     
     # Fibonacci levels (horizontal lines)
     fib_colors = {'38.2': '#FCD34D', '50.0': '#F59E0B', '61.8': '#F97316'}
@@ -90,8 +198,8 @@ def create_technical_chart(df, fib_levels, summary):
             )
     
     # 1-year high/low (dashed)
-    year_high = df_chart['Year_High'].iloc[-1]
-    year_low = df_chart['Year_Low'].iloc[-1]
+    year_high = df_chart['Year_High'].iat[-1]
+    year_low = df_chart['Year_Low'].iat[-1]
     
     fig.add_hline(
         y=year_high,
@@ -115,97 +223,24 @@ def create_technical_chart(df, fib_levels, summary):
         row=1, col=1
     )
     
-    # =====================================================================
-    # PANEL 2: RSI
-    # =====================================================================
-    
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['RSI'],
-        mode='lines',
-        name='RSI',
-        line=dict(color='#00A676', width=2),
-    ), row=2, col=1)
-    
     # RSI levels (30, 50, 70)
     fig.add_hline(y=70, line_dash="dot", line_color="#EF4444", line_width=1, opacity=0.5, row=2, col=1)
     fig.add_hline(y=50, line_dash="dot", line_color="#888888", line_width=1, opacity=0.5, row=2, col=1)
     fig.add_hline(y=30, line_dash="dot", line_color="#00A676", line_width=1, opacity=0.5, row=2, col=1)
     
-    # =====================================================================
-    # PANEL 3: MACD
-    # =====================================================================
-    
-    # MACD line
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['MACD'],
-        mode='lines',
-        name='MACD',
-        line=dict(color='#3B82F6', width=2),
-    ), row=3, col=1)
-    
-    # Signal line
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['MACD_Signal'],
-        mode='lines',
-        name='Signal',
-        line=dict(color='#F59E0B', width=1.5),
-    ), row=3, col=1)
-    
-    # Histogram
-    colors = ['#00A676' if val >= 0 else '#EF4444' for val in df_chart['MACD_Hist']]
-    fig.add_trace(go.Bar(
-        x=df_chart.index,
-        y=df_chart['MACD_Hist'],
-        name='Histogram',
-        marker_color=colors,
-        opacity=0.5
-    ), row=3, col=1)
-    
-    # Zero line
+    # MACD zero line
     fig.add_hline(y=0, line_dash="dot", line_color="#888888", line_width=1, row=3, col=1)
     
-    # =====================================================================
-    # PANEL 4: BOLLINGER WIDTH
-    # =====================================================================
-    
-    fig.add_trace(go.Scatter(
-        x=df_chart.index,
-        y=df_chart['BB_Width'],
-        mode='lines',
-        name='BB Width',
-        line=dict(color='#8B5CF6', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(139, 92, 246, 0.2)'
-    ), row=4, col=1)
-    
     # =====================================================================
     # LAYOUT
     # =====================================================================
     
     fig.update_layout(
-        height=1200,
-        plot_bgcolor='#1a1f2e',
-        paper_bgcolor='#0f1419',
-        font=dict(color='#FFFFFF', family='Arial', size=11),
-        showlegend=True,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1,
-            bgcolor='rgba(26, 31, 46, 0.8)',
-            bordercolor='#3a4254',
-            borderwidth=1
-        ),
+        template=CHART_TEMPLATE,
         xaxis4=dict(
             rangeslider=dict(visible=False),
             gridcolor='rgba(255, 255, 255, 0.1)'
-        ),
-        margin=dict(l=60, r=60, t=80, b=60)
+        )
     )
     
     # Update all y-axes
@@ -5,59 +5,174 @@ Pure price-based indicators with scoring and narrative generation
 import pandas as pd
 import numpy as np
 import yfinance as yf
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 from datetime import datetime, timedelta
+import hashlib
 import json
+import math
+import sys
+import os
 from pathlib import Path
 
-def fetch_eurusd_daily(lookback_days=730):
-    """Fetch daily EURUSD data from Yahoo Finance"""
+# Optional IIR filter for the EMAs (pandas ewm without scipy)
+try:
+    from scipy.signal import lfilter
+    SCIPY_AVAILABLE = True
+except ImportError:
+    SCIPY_AVAILABLE = False
+
+# Optional JIT for the scalar scoring rules (plain Python without numba);
+# the shared shim lives one folder up (FX Views/fx_utils.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fx_utils import njit
+
+# Indicator values reported in the JSON summary
+SUMMARY_INDICATORS = (
+    'SMA_50', 'SMA_100', 'SMA_200', 'RSI', 'MACD', 'MACD_Signal',
+    'BB_Upper', 'BB_Middle', 'BB_Lower', 'ATR',
+)
+
+# On-disk copy of the daily history; later runs only append the newest bars
+PRICE_CACHE_PATH = Path(__file__).parent.parent / 'technical_outputs' / '_cache' / 'eurusd_daily.parquet'
+
+# Finished summaries, keyed by a hash of the price history they were built from
+SUMMARY_CACHE_DIR = PRICE_CACHE_PATH.parent
+
+def fetch_eurusd_daily(lookback_days=730, cache_path=PRICE_CACHE_PATH):
+    """
+    Fetch daily EURUSD data from Yahoo Finance
+    
+    Bars already in the parquet cache are not downloaded again: only the
+    last cached bar (it may have been taken intraday) onwards is fetched
+    and appended. A cache that does not reach back to the requested start
+    is rebuilt with a full download.
+    """
     ticker = yf.Ticker("EURUSD=X")
     end_date = datetime.now()
     start_date = end_date - timedelta(days=lookback_days)
+    cache_path = Path(cache_path)
+    
+    cached = None
+    if cache_path.exists():
+        cached = pd.read_parquet(cache_path)
+        # Allow a few days of slack for weekends / holidays at the start
+        if cached.empty or cached.index[0].date() > (start_date + timedelta(days=5)).date():
+            cached = None
     
-    df = ticker.history(start=start_date, end=end_date, interval='1d')
+    fetch_start = cached.index[-1].date() if cached is not None else start_date
+    df = ticker.history(start=fetch_start, end=end_date, interval='1d')
     df = df[['Open', 'High', 'Low', 'Close', 'Volume']].copy()
     df.index = pd.to_datetime(df.index)
     
-    return df
+    if cached is not None:
+        df = pd.concat([cached, df])
+        df = df[~df.index.duplicated(keep='last')].sort_index()
+    
+    # Write-then-rename so a concurrent reader never sees a half-written file
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix('.parquet.part')
+    df.to_parquet(tmp_path, engine='pyarrow', compression='zstd')
+    os.replace(tmp_path, cache_path)
+    
+    return df[df.index.date >= start_date.date()]
+
+def price_data_key(df):
+    """
+    Digest of the price history (and of this script) a summary is built from
+    
+    The whole fetched frame is hashed rather than a fixed tail: the
+    Fibonacci swing (15 months) and the volatility percentiles (the full
+    history) look back further than any indicator window. Hashing the
+    source as well means an edited indicator or scoring rule never
+    returns a stale cached summary.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update(Path(__file__).read_bytes())
+    h.update(df.index.asi8.tobytes())
+    for col in df.columns:
+        h.update(np.ascontiguousarray(df[col].to_numpy()).tobytes())
+    return h.hexdigest()
+
+def _prefix_sums(x):
+    """Prefix sums of x (NaNs counted separately) for O(1) trailing-window sums"""
+    x = np.asarray(x, dtype=np.float64)
+    nan = np.isnan(x)
+    csum = np.concatenate(([0.0], np.cumsum(np.where(nan, 0.0, x))))
+    cnan = np.concatenate(([0], np.cumsum(nan)))
+    return csum, cnan
+
+def _window_sum(prefix, window):
+    """Trailing-window sum from _prefix_sums (NaN until the window is full or if it holds a NaN)"""
+    csum, cnan = prefix
+    out = np.full(csum.size - 1, np.nan)
+    if out.size >= window:
+        sums = csum[window:] - csum[:-window]
+        sums[(cnan[window:] - cnan[:-window]) > 0] = np.nan
+        out[window - 1:] = sums
+    return out
+
+def _ewm(x, span):
+    """
+    EMA matching pandas ewm(span=span, adjust=False) as a first-order IIR filter
+    
+    The filter state is seeded with the first value so y[0] == x[0], as in pandas.
+    Series with gaps (or no scipy) fall back to pandas, which skips NaNs instead of propagating them.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    if not SCIPY_AVAILABLE or x.size == 0 or np.isnan(x).any():
+        return pd.Series(x).ewm(span=span, adjust=False).mean().to_numpy()
+    alpha = 2.0 / (span + 1.0)
+    y, _ = lfilter([alpha], [1.0, alpha - 1.0], x, zi=[(1.0 - alpha) * x[0]])
+    return y
 
 def calculate_indicators(df):
     """Calculate all technical indicators"""
     data = df.copy()
+    close = data['Close'].to_numpy(dtype=np.float64)
+    
+    # Every Close-based window (SMAs, BB middle) reads the same prefix sums
+    close_prefix = _prefix_sums(close)
     
     # Moving Averages
-    data['SMA_50'] = data['Close'].rolling(window=50).mean()
-    data['SMA_100'] = data['Close'].rolling(window=100).mean()
-    data['SMA_200'] = data['Close'].rolling(window=200).mean()
+    data['SMA_50'] = _window_sum(close_prefix, 50) / 50
+    data['SMA_100'] = _window_sum(close_prefix, 100) / 100
+    data['SMA_200'] = _window_sum(close_prefix, 200) / 200
     
     # RSI (14)
-    delta = data['Close'].diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-    rs = gain / loss
-    data['RSI'] = 100 - (100 / (1 + rs))
+    delta = np.diff(close, prepend=np.nan)
+    gain = _window_sum(_prefix_sums(np.where(delta > 0, delta, 0.0)), 14) / 14
+    loss = _window_sum(_prefix_sums(np.where(delta < 0, -delta, 0.0)), 14) / 14
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = gain / loss
+        data['RSI'] = 100 - (100 / (1 + rs))
     
     # MACD (12, 26, 9)
-    exp1 = data['Close'].ewm(span=12, adjust=False).mean()
-    exp2 = data['Close'].ewm(span=26, adjust=False).mean()
-    data['MACD'] = exp1 - exp2
-    data['MACD_Signal'] = data['MACD'].ewm(span=9, adjust=False).mean()
-    data['MACD_Hist'] = data['MACD'] - data['MACD_Signal']
-    
-    # Bollinger Bands (20, 2)
-    data['BB_Middle'] = data['Close'].rolling(window=20).mean()
-    bb_std = data['Close'].rolling(window=20).std()
-    data['BB_Upper'] = data['BB_Middle'] + (bb_std * 2)
-    data['BB_Lower'] = data['BB_Middle'] - (bb_std * 2)
+    macd = _ewm(close, 12) - _ewm(close, 26)
+    macd_signal = _ewm(macd, 9)
+    data['MACD'] = macd
+    data['MACD_Signal'] = macd_signal
+    data['MACD_Hist'] = macd - macd_signal
+    data['MACD_Hist_prev'] = data['MACD_Hist'].shift(1)
+    
+    # Bollinger Bands (20, 2) - sample std from centred sum / sum of squares
+    centred = close - np.nanmean(close)
+    s1 = _window_sum(_prefix_sums(centred), 20)
+    s2 = _window_sum(_prefix_sums(centred * centred), 20)
+    bb_middle = _window_sum(close_prefix, 20) / 20
+    bb_std = np.sqrt(np.maximum(s2 - s1 * s1 / 20, 0.0) / 19)
+    data['BB_Middle'] = bb_middle
+    data['BB_Upper'] = bb_middle + (bb_std * 2)
+    data['BB_Lower'] = bb_middle - (bb_std * 2)
     data['BB_Width'] = data['BB_Upper'] - data['BB_Lower']
     
     # ATR (20)
-    high_low = data['High'] - data['Low']
-    high_close = np.abs(data['High'] - data['Close'].shift())
-    low_close = np.abs(data['Low'] - data['Close'].shift())
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = np.max(ranges, axis=1)
-    data['ATR'] = true_range.rolling(14).mean()
+    high = data['High'].to_numpy(dtype=np.float64)
+    low = data['Low'].to_numpy(dtype=np.float64)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    # fmax skips the missing previous close on the first row, like DataFrame.max
+    true_range = np.fmax.reduce([high - low, np.abs(high - prev_close), np.abs(low - prev_close)])
+    data['ATR'] = _window_sum(_prefix_sums(true_range), 14) / 14
     
     # 1-year high/low
     data['Year_High'] = data['High'].rolling(window=252).max()
@@ -91,82 +206,92 @@ def calculate_percentiles(df):
     
     percentiles = {}
     
-    # BB Width percentile
-    if 'BB_Width' in df.columns:
-        bb_width_5y = df['BB_Width'].tail(lookback_5y)
-        current_bb_width = df['BB_Width'].iloc[-1]
-        percentiles['bb_width_pct'] = (bb_width_5y < current_bb_width).sum() / len(bb_width_5y) * 100
-    
-    # ATR percentile
-    if 'ATR' in df.columns:
-        atr_5y = df['ATR'].tail(lookback_5y)
-        current_atr = df['ATR'].iloc[-1]
-        percentiles['atr_pct'] = (atr_5y < current_atr).sum() / len(atr_5y) * 100
+    # Share of the 5y window strictly below the latest value: sort once,
+    # then a binary search replaces the full comparison scan
+    for col, key in (('BB_Width', 'bb_width_pct'), ('ATR', 'atr_pct')):
+        if col in df.columns:
+            values = df[col].to_numpy()
+            window = np.sort(values[-lookback_5y:])
+            current = values[-1]
+            below = 0 if np.isnan(current) else np.searchsorted(window, current, side='left')
+            percentiles[key] = below / window.size * 100
     
     return percentiles
 
-def calculate_technical_score(latest, fib_levels, percentiles):
-    """Calculate technical score (-3 to +3)"""
+def _scalar(values, key):
+    """Plain float for values[key] (NaN when missing)"""
+    v = values.get(key)
+    return float('nan') if v is None else float(v)
+
+@njit(cache=True)
+def _score_kernel(spot, sma_200, sma_100, sma_50, fib_50, rsi, macd_hist, macd_hist_prev,
+                  bb_middle, bb_width_pct, atr_pct):
+    """Scoring rules of calculate_technical_score on bare floats (NaN = missing)"""
     score = 0.0
     
-    spot = latest['Close']
-    
     # === STRUCTURE SCORE (50%) ===
     # 200-day MA
-    if pd.notna(latest['SMA_200']):
-        score += 1.0 if spot > latest['SMA_200'] else -1.0
+    if not math.isnan(sma_200):
+        score += 1.0 if spot > sma_200 else -1.0
     
     # 100-day MA
-    if pd.notna(latest['SMA_100']):
-        score += 0.5 if spot > latest['SMA_100'] else -0.5
+    if not math.isnan(sma_100):
+        score += 0.5 if spot > sma_100 else -0.5
     
     # 50-day MA
-    if pd.notna(latest['SMA_50']):
-        score += 0.5 if spot > latest['SMA_50'] else -0.5
+    if not math.isnan(sma_50):
+        score += 0.5 if spot > sma_50 else -0.5
     
     # Fib 50%
-    fib_50 = fib_levels.get('50.0')
-    if fib_50:
+    if not math.isnan(fib_50):
         score += 0.5 if spot > fib_50 else -0.5
     
     # === MOMENTUM & VOLATILITY SCORE (50%) ===
     # RSI
-    if pd.notna(latest['RSI']):
-        if latest['RSI'] > 55:
+    if not math.isnan(rsi):
+        if rsi > 55:
             score += 1.0
-        elif latest['RSI'] < 45:
+        elif rsi < 45:
             score -= 1.0
     
-    # MACD (rising/falling based on histogram)
-    if pd.notna(latest['MACD_Hist']):
-        # Compare to previous value
-        if 'MACD_Hist_prev' in latest:
-            if latest['MACD_Hist'] > latest['MACD_Hist_prev']:
-                score += 1.0
-            else:
-                score -= 1.0
+    # MACD (rising/falling based on histogram vs previous value)
+    if not math.isnan(macd_hist) and not math.isnan(macd_hist_prev):
+        score += 1.0 if macd_hist > macd_hist_prev else -1.0
     
-    # Bollinger
-    bb_width_pct = percentiles.get('bb_width_pct', 50)
-    if bb_width_pct < 30:
-        # Compressed - neutral
-        pass
-    elif bb_width_pct > 70:
+    # Bollinger: compressed (< 30) is neutral
+    if bb_width_pct > 70:
         # Expanded
-        if spot > latest['BB_Middle']:
+        if spot > bb_middle:
             score += 0.5  # expansion up
         else:
             score -= 0.5  # expansion down
     
     # ATR
-    atr_pct = percentiles.get('atr_pct', 50)
     if atr_pct > 70:
         score -= 0.5  # exhaustion risk
     
     # Clamp to -3 to +3
-    score = max(-3.0, min(3.0, score))
+    return max(-3.0, min(3.0, score))
+
+def calculate_technical_score(latest, fib_levels, percentiles):
+    """Calculate technical score (-3 to +3)"""
+    # Pull bare floats once, then run the (optionally jitted) rules
+    values = dict(latest)
+    fib_50 = fib_levels.get('50.0')
     
-    return score
+    return _score_kernel(
+        float(values['Close']),
+        _scalar(values, 'SMA_200'),
+        _scalar(values, 'SMA_100'),
+        _scalar(values, 'SMA_50'),
+        float(fib_50) if fib_50 else float('nan'),
+        _scalar(values, 'RSI'),
+        _scalar(values, 'MACD_Hist'),
+        _scalar(values, 'MACD_Hist_prev'),
+        _scalar(values, 'BB_Middle'),
+        float(percentiles.get('bb_width_pct', 50)),
+        float(percentiles.get('atr_pct', 50)),
+    )
 
 def determine_regime(score):
     """Determine technical regime from score"""
@@ -179,70 +304,83 @@ def determine_regime(score):
 
 def get_key_levels(latest, fib_levels):
     """Get top 5 key levels with distances"""
-    spot = latest['Close']
-    
-    levels = []
-    
-    # 200-day MA
-    if pd.notna(latest['SMA_200']):
-        levels.append({
-            'name': '200-day MA',
-            'price': latest['SMA_200'],
-            'distance_pct': ((latest['SMA_200'] - spot) / spot) * 100,
-            'type': 'Support' if latest['SMA_200'] < spot else 'Resistance'
-        })
-    
-    # Fib levels (38.2, 50, 61.8)
-    for fib_name in ['38.2', '50.0', '61.8']:
-        if fib_name in fib_levels:
-            fib_price = fib_levels[fib_name]
-            levels.append({
-                'name': f'Fib {fib_name}%',
-                'price': fib_price,
-                'distance_pct': ((fib_price - spot) / spot) * 100,
-                'type': 'Support' if fib_price < spot else 'Resistance'
-            })
-    
-    # 100-day MA
-    if pd.notna(latest['SMA_100']):
-        levels.append({
-            'name': '100-day MA',
-            'price': latest['SMA_100'],
-            'distance_pct': ((latest['SMA_100'] - spot) / spot) * 100,
-            'type': 'Support' if latest['SMA_100'] < spot else 'Resistance'
-        })
+    spot = float(latest['Close'])
+    nan = float('nan')
     
     # 1-year high/low (closest)
-    year_high_dist = abs(((latest['Year_High'] - spot) / spot) * 100)
-    year_low_dist = abs(((latest['Year_Low'] - spot) / spot) * 100)
-    
-    if year_high_dist < year_low_dist:
-        levels.append({
-            'name': '1-year High',
-            'price': latest['Year_High'],
-            'distance_pct': ((latest['Year_High'] - spot) / spot) * 100,
-            'type': 'Resistance'
-        })
+    year_high = float(latest['Year_High'])
+    year_low = float(latest['Year_Low'])
+    use_high = abs(year_high - spot) < abs(year_low - spot)
+    
+    # Candidate table; missing levels are NaN and dropped below
+    names = np.array(['200-day MA', 'Fib 38.2%', 'Fib 50.0%', 'Fib 61.8%',
+                      '100-day MA', '1-year High' if use_high else '1-year Low', '50-day MA'])
+    prices = np.array([
+        latest['SMA_200'],
+        fib_levels.get('38.2', nan),
+        fib_levels.get('50.0', nan),
+        fib_levels.get('61.8', nan),
+        latest['SMA_100'],
+        year_high if use_high else year_low,
+        latest['SMA_50'],
+    ], dtype=np.float64)
+    
+    distance_pct = (prices - spot) / spot * 100
+    types = np.where(prices < spot, 'Support', 'Resistance')
+    types[5] = 'Resistance' if use_high else 'Support'
+    
+    # Take the 5 closest by absolute distance: partial selection, then order
+    # just those (ties keep table order)
+    valid = np.flatnonzero(~np.isnan(prices))
+    abs_dist = np.abs(distance_pct[valid])
+    if valid.size > 5:
+        sel = np.argpartition(abs_dist, 4)[:5]
+        sel.sort()
     else:
-        levels.append({
-            'name': '1-year Low',
-            'price': latest['Year_Low'],
-            'distance_pct': ((latest['Year_Low'] - spot) / spot) * 100,
-            'type': 'Support'
-        })
-    
-    # 50-day MA
-    if pd.notna(latest['SMA_50']):
-        levels.append({
-            'name': '50-day MA',
-            'price': latest['SMA_50'],
-            'distance_pct': ((latest['SMA_50'] - spot) / spot) * 100,
-            'type': 'Support' if latest['SMA_50'] < spot else 'Resistance'
-        })
-    
-    # Sort by absolute distance and take top 5
-    levels.sort(key=lambda x: abs(x['distance_pct']))
-    return levels[:5]
+        sel = np.arange(valid.size)
+    top = valid[sel[np.argsort(abs_dist[sel], kind='stable')]]
+    
+    return [
+        {
+            'name': str(names[i]),
+            'price': float(prices[i]),
+            'distance_pct': float(distance_pct[i]),
+            'type': str(types[i])
+        }
+        for i in top
+    ]
+
+# Narrative lookup tables. Bucket edges in *_LOWER belong to the bucket above
+# (x >= edge), edges in *_UPPER to the bucket below (x <= edge)
+MOMENTUM_LOWER = np.array([30.0, 45.0])
+MOMENTUM_UPPER = np.array([55.0, 70.0])
+MOMENTUM_STATES = (  # sentence-initial in the narrative, stored capitalised
+    "Oversold conditions",
+    "Bearish momentum",
+    "Neutral momentum",
+    "Bullish momentum",
+    "Overbought conditions",
+)
+
+VOL_LOWER = np.array([30.0])
+VOL_UPPER = np.array([70.0])
+VOL_STATES = (
+    "volatility compressed, suggesting a directional move is likely but not yet confirmed",
+    "volatility normal",
+    "volatility elevated, indicating an active trend",
+)
+
+STANCES = {
+    "Bullish": "Net technical stance: constructive",
+    "Bearish": "Net technical stance: defensive",
+    "Neutral": "Net technical stance: neutral / range-bound",
+}
+
+def _bucket(x, lower, upper, default):
+    """Index of the threshold bucket holding x (default when x is NaN)"""
+    if math.isnan(x):
+        return default
+    return int(np.searchsorted(lower, x, side='right') + np.searchsorted(upper, x, side='left'))
 
 def generate_narrative(latest, score, regime, fib_levels, percentiles):
     """Generate technical narrative paragraph"""
@@ -258,41 +396,28 @@ def generate_narrative(latest, score, regime, fib_levels, percentiles):
         ma_context = "shows mixed trend structure"
     
     # Momentum
-    rsi = latest['RSI']
-    if rsi > 70:
-        momentum = "overbought conditions"
-    elif rsi < 30:
-        momentum = "oversold conditions"
-    elif rsi > 55:
-        momentum = "bullish momentum"
-    elif rsi < 45:
-        momentum = "bearish momentum"
-    else:
-        momentum = "neutral momentum"
+    rsi = float(latest['RSI'])
+    momentum = MOMENTUM_STATES[_bucket(rsi, MOMENTUM_LOWER, MOMENTUM_UPPER, default=2)]
     
     # Volatility
     bb_width_pct = percentiles.get('bb_width_pct', 50)
-    if bb_width_pct < 30:
-        vol_state = "volatility compressed, suggesting a directional move is likely but not yet confirmed"
-    elif bb_width_pct > 70:
-        vol_state = "volatility elevated, indicating an active trend"
-    else:
-        vol_state = "volatility normal"
+    vol_state = VOL_STATES[_bucket(bb_width_pct, VOL_LOWER, VOL_UPPER, default=1)]
     
     # Net stance
-    if regime == "Bullish":
-        stance = "Net technical stance: constructive"
-    elif regime == "Bearish":
-        stance = "Net technical stance: defensive"
-    else:
-        stance = "Net technical stance: neutral / range-bound"
+    stance = STANCES.get(regime, STANCES['Neutral'])
     
-    narrative = f"EURUSD {ma_context}. {momentum.capitalize()} and {vol_state}. {stance}."
+    narrative = f"EURUSD {ma_context}. {momentum} and {vol_state}. {stance}."
     
     return narrative
 
-def run_technical_analysis():
-    """Main function to run technical analysis"""
+def run_technical_analysis(force=False):
+    """
+    Main function to run technical analysis
+    
+    When the fetched prices are bit-identical to a previous run the cached
+    summary is reused and the indicator, score and narrative steps are
+    skipped; force=True (or --force on the command line) always recomputes.
+    """
     print("="*80)
     print("EURUSD TECHNICAL ANALYSIS")
     print("="*80)
@@ -302,6 +427,25 @@ def run_technical_analysis():
     df = fetch_eurusd_daily(lookback_days=730)
     print(f"✓ {len(df)} days loaded")
     
+    output_dir = Path(__file__).parent.parent / 'technical_outputs'
+    output_dir.mkdir(exist_ok=True)
+    data_path = output_dir / 'eurusd_technical_data.csv'
+    summary_path = output_dir / 'eurusd_technical_summary.json'
+    
+    # Same prices as a previous run: reuse its summary and indicator file
+    data_key = price_data_key(df)
+    cache_path = SUMMARY_CACHE_DIR / f'cache_{data_key}.json'
+    if not force and cache_path.exists() and data_path.exists():
+        with open(cache_path) as f:
+            summary = json.load(f)
+        with open(summary_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        df = pd.read_csv(data_path, index_col=0, parse_dates=True)
+        print(f"\n✓ Prices unchanged since {summary['last_updated']}: reused cached summary")
+        print(f"✓ Technical Score: {summary['technical_score']:+.2f} ({summary['regime']})")
+        print(f"✓ Saved: {summary_path}")
+        return df, summary
+    
     # Calculate indicators
     print("\nCalculating technical indicators...")
     df = calculate_indicators(df)
@@ -317,9 +461,8 @@ def run_technical_analysis():
     percentiles = calculate_percentiles(df)
     print(f"✓ BB Width: {percentiles.get('bb_width_pct', 0):.1f}%ile, ATR: {percentiles.get('atr_pct', 0):.1f}%ile")
     
-    # Get latest
-    latest = df.iloc[-1].copy()
-    latest['MACD_Hist_prev'] = df.iloc[-2]['MACD_Hist']
+    # Get latest (plain scalars straight from each column, no row Series)
+    latest = {col: df[col].iat[-1] for col in df.columns}
     
     # Calculate score
     print("\nCalculating technical score...")
@@ -340,42 +483,41 @@ def run_technical_analysis():
     print(f"✓ {narrative}")
     
     # Save outputs
-    output_dir = Path(__file__).parent.parent / 'technical_outputs'
-    output_dir.mkdir(exist_ok=True)
-    
-    # Save full data
-    df.to_csv(output_dir / 'eurusd_technical_data.csv')
-    
-    # Save summary
+    # Save full data (Arrow's C CSV writer; Date as the bar's calendar date)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.add_column(0, 'Date', pa.array(df.index.date, type=pa.date32()))
+    pa_csv.write_csv(table, str(data_path))
+    
+    # Save summary (missing indicators as null, from one vectorised NaN check)
+    ind_values = np.array([latest[col] for col in SUMMARY_INDICATORS], dtype=np.float64)
+    ind_ok = ~np.isnan(ind_values)
     summary = {
-        'date': latest.name.strftime('%Y-%m-%d'),
+        'date': df.index[-1].strftime('%Y-%m-%d'),
         'spot': float(latest['Close']),
         'technical_score': float(score),
         'regime': regime,
         'narrative': narrative,
-        'indicators': {
-            'SMA_50': float(latest['SMA_50']) if pd.notna(latest['SMA_50']) else None,
-            'SMA_100': float(latest['SMA_100']) if pd.notna(latest['SMA_100']) else None,
-            'SMA_200': float(latest['SMA_200']) if pd.notna(latest['SMA_200']) else None,
-            'RSI': float(latest['RSI']) if pd.notna(latest['RSI']) else None,
-            'MACD': float(latest['MACD']) if pd.notna(latest['MACD']) else None,
-            'MACD_Signal': float(latest['MACD_Signal']) if pd.notna(latest['MACD_Signal']) else None,
-            'BB_Upper': float(latest['BB_Upper']) if pd.notna(latest['BB_Upper']) else None,
-            'BB_Middle': float(latest['BB_Middle']) if pd.notna(latest['BB_Middle']) else None,
-            'BB_Lower': float(latest['BB_Lower']) if pd.notna(latest['BB_Lower']) else None,
-            'ATR': float(latest['ATR']) if pd.notna(latest['ATR']) else None,
-        },
+        'indicators': {col: (float(v) if ok else None) for col, v, ok in zip(SUMMARY_INDICATORS, ind_values, ind_ok)},
         'fib_levels': {k: float(v) for k, v in fib_levels.items()},
         'percentiles': percentiles,
         'key_levels': key_levels,
         'last_updated': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     }
     
-    with open(output_dir / 'eurusd_technical_summary.json', 'w') as f:
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2)
+    
+    # Memoize under the data key (only the latest key is kept)
+    SUMMARY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in SUMMARY_CACHE_DIR.glob('cache_*.json'):
+        stale.unlink()
+    tmp_path = cache_path.with_suffix('.json.part')
+    with open(tmp_path, 'w') as f:
         json.dump(summary, f, indent=2)
+    os.replace(tmp_path, cache_path)
     
-    print(f"\n✓ Saved: {output_dir / 'eurusd_technical_data.csv'}")
-    print(f"✓ Saved: {output_dir / 'eurusd_technical_summary.json'}")
+    print(f"\n✓ Saved: {data_path}")
+    print(f"✓ Saved: {summary_path}")
     
     print("\n" + "="*80)
     print("TECHNICAL ANALYSIS COMPLETE")
@@ -384,5 +526,5 @@ def run_technical_analysis():
     return df, summary
 
 if __name__ == '__main__':
-    run_technical_analysis()
+    run_technical_analysis(force='--force' in sys.argv[1:])
 
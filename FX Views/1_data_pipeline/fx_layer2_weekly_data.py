@@ -18,8 +18,8 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 from data_fetcher import DataFetcher
-import pickle
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 print("="*80)
 print("FX LAYER 2 - BUILDING WEEKLY PRESSURE DATASET")
@@ -29,6 +29,32 @@ print("="*80)
 
 fetcher = DataFetcher()
 
+# Same-day disk cache for FRED downloads (run from the repo root)
+FRED_CACHE_DIR = Path('.fred_cache')
+
+def fetch_fred_cached(series_id, years_back=20, cache_dir=FRED_CACHE_DIR):
+    """
+    FRED series through a same-day parquet cache
+    
+    FRED updates daily series at most once a day, so a file written today is
+    reused as-is. Anything older is re-downloaded in full (one request per
+    series either way, and it picks up revisions).
+    
+    Returns:
+    - (DataFrame with date/value columns or None, served_from_cache)
+    """
+    cache_path = Path(cache_dir) / f"{series_id}_{years_back}y.parquet"
+    if cache_path.exists():
+        cached_on = datetime.fromtimestamp(cache_path.stat().st_mtime).date()
+        if cached_on == datetime.now().date():
+            return pd.read_parquet(cache_path), True
+    
+    df = fetcher.get_fred_series(series_id, years_back=years_back)
+    if df is not None and not df.empty:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        df.to_parquet(cache_path, engine='pyarrow', compression='zstd', index=False)
+    return df, False
+
 # ============================================================================
 # 1. DAILY MARKET SERIES → Weekly
 # ============================================================================
@@ -62,28 +88,38 @@ daily_series_config = {
     'DEXUSEU': ('last', 'EURUSD Spot'),
 }
 
-weekly_data = {}
-for series_id, (agg_method, name) in daily_series_config.items():
-    print(f"  Fetching {series_id:20s} ({name})...")
+def _fetch_one(series_id):
     try:
-        df = fetcher.get_fred_series(series_id, years_back=20)
-        if df is not None and not df.empty:
-            series = df.set_index('date')['value']
-            
-            # Resample to weekly (Friday close, standard market convention)
-            if agg_method == 'last':
-                weekly_series = series.resample('W-FRI').last()
-            elif agg_method == 'mean':
-                weekly_series = series.resample('W-FRI').mean()
-            else:
-                weekly_series = series.resample('W-FRI').last()
-            
-            weekly_data[series_id] = weekly_series
-            print(f"    ✓ {len(weekly_series)} weeks, latest: {weekly_series.index.max().strftime('%Y-%m-%d')}")
-        else:
-            print(f"    ✗ Failed")
+        return fetch_fred_cached(series_id, years_back=20) + (None,)
     except Exception as e:
-        print(f"    ✗ Error: {e}")
+        return None, False, e
+
+# Downloads are IO-bound: keep every series in flight at once, report in config order
+series_ids = list(daily_series_config)
+with ThreadPoolExecutor(max_workers=len(series_ids)) as ex:
+    results = list(ex.map(_fetch_one, series_ids))
+
+raw_daily = {}
+for series_id, (df, from_cache, error) in zip(series_ids, results):
+    print(f"  Fetching {series_id:20s} ({daily_series_config[series_id][1]})...")
+    if error is not None:
+        print(f"    ✗ Error: {error}")
+    elif df is not None and not df.empty:
+        raw_daily[series_id] = df.set_index('date')['value']
+        source = "cache" if from_cache else "FRED"
+        print(f"    ✓ {len(df)} daily obs ({source}), latest: {df['date'].max().strftime('%Y-%m-%d')}")
+    else:
+        print(f"    ✗ Failed")
+
+# Resample all series to weekly (Friday close, standard market convention)
+# in one pass over the combined daily frame, with a per-column aggregation
+if raw_daily:
+    wide_daily = pd.concat(raw_daily, axis=1)
+    agg_map = {sid: daily_series_config[sid][0] for sid in wide_daily.columns}
+    df_weekly = wide_daily.resample('W-FRI').agg(agg_map)
+    print(f"  ✓ Weekly: {len(df_weekly)} weeks × {len(df_weekly.columns)} series")
+else:
+    df_weekly = pd.DataFrame()
 
 # ============================================================================
 # 2. EA YIELDS FROM CSV → Weekly
@@ -94,23 +130,32 @@ print("\n[2] Loading EA yields from CSV (resample to weekly)...")
 csv_path = Path('eurozone_data/ecb_yield_curve_full.csv')
 if csv_path.exists():
     try:
-        df_yields = pd.read_csv(csv_path)
-        df_yields['TIME_PERIOD'] = pd.to_datetime(df_yields['TIME_PERIOD'])
-        df_yields['OBS_VALUE'] = pd.to_numeric(df_yields['OBS_VALUE'], errors='coerce')
-        
-        # Extract key maturities
-        ea_1y = df_yields[df_yields['maturity'].str.contains('1 year', case=False, na=False)]
-        ea_2y = df_yields[df_yields['maturity'].str.contains('2 year', case=False, na=False)]
-        ea_10y = df_yields[df_yields['maturity'].str.contains('10 year', case=False, na=False)]
+        # Parsed parquet sidecar, rebuilt only when the CSV is newer
+        parsed_path = csv_path.with_suffix('.parquet')
+        if parsed_path.exists() and parsed_path.stat().st_mtime >= csv_path.stat().st_mtime:
+            df_yields = pd.read_parquet(parsed_path)
+        else:
+            df_yields = pd.read_csv(csv_path, usecols=['maturity', 'TIME_PERIOD', 'OBS_VALUE'])
+            df_yields['TIME_PERIOD'] = pd.to_datetime(df_yields['TIME_PERIOD'])
+            df_yields['OBS_VALUE'] = pd.to_numeric(df_yields['OBS_VALUE'], errors='coerce')
+            df_yields.to_parquet(parsed_path, engine='pyarrow', compression='zstd', index=False)
         
-        # Resample to weekly (last available in week)
-        ea_1y_weekly = ea_1y.set_index('TIME_PERIOD')['OBS_VALUE'].resample('W-FRI').last()
-        ea_2y_weekly = ea_2y.set_index('TIME_PERIOD')['OBS_VALUE'].resample('W-FRI').last()
-        ea_10y_weekly = ea_10y.set_index('TIME_PERIOD')['OBS_VALUE'].resample('W-FRI').last()
+        # Bucket the key maturities in one pass (whole-number match - a plain
+        # substring test for '1 year' also caught the 11y and 21y rows)
+        years = pd.to_numeric(df_yields['maturity'].str.extract(r'(\d+)\s*year', expand=False), errors='coerce')
+        df_yields['bucket'] = years.map({1: 'EA_1Y', 2: 'EA_2Y', 10: 'EA_10Y'})
         
-        weekly_data['EA_1Y'] = ea_1y_weekly
-        weekly_data['EA_2Y'] = ea_2y_weekly
-        weekly_data['EA_10Y'] = ea_10y_weekly
+        # Resample to weekly (last available in week), all maturities at once
+        ea_weekly = (
+            df_yields.dropna(subset=['bucket'])
+            .set_index('TIME_PERIOD')
+            .groupby('bucket')['OBS_VALUE']
+            .resample('W-FRI').last()
+            .unstack(0)
+            .reindex(columns=['EA_1Y', 'EA_2Y', 'EA_10Y'])
+        )
+        ea_10y_weekly = ea_weekly['EA_10Y']
+        df_weekly = df_weekly.join(ea_weekly, how='outer')
         
         print(f"  ✓ EA yields: {len(ea_10y_weekly)} weeks")
         print(f"    Latest: {ea_10y_weekly.index.max().strftime('%Y-%m-%d')}, EA 10Y: {ea_10y_weekly.iloc[-1]:.2f}%")
@@ -125,7 +170,6 @@ else:
 
 print("\n[3] Combining all weekly series...")
 
-df_weekly = pd.DataFrame(weekly_data)
 print(f"  Combined: {len(df_weekly)} weeks × {len(df_weekly.columns)} series")
 print(f"  Date range: {df_weekly.index.min().strftime('%Y-%m-%d')} to {df_weekly.index.max().strftime('%Y-%m-%d')}")
 
@@ -151,10 +195,16 @@ if dropped > 0:
 
 print(f"\n✓ Final weekly dataset: {len(df_weekly)} weeks × {len(df_weekly.columns)} series")
 
-# Save raw weekly data
-output_path = 'fx_layer2_weekly_raw.pkl'
-with open(output_path, 'wb') as f:
-    pickle.dump(df_weekly, f)
+# Market series carry far fewer significant digits than float64: store as
+# float32 (half the bytes for every later pass) and report the worst rounding
+df_weekly32 = df_weekly.astype(np.float32)
+cast_err = ((df_weekly32.astype(np.float64) - df_weekly).abs() / df_weekly.abs().clip(lower=1.0)).max().max()
+print(f"  float32 storage: max relative rounding {cast_err:.1e}")
+df_weekly = df_weekly32
+
+# Save raw weekly data (columnar parquet)
+output_path = 'fx_layer2_weekly_raw.parquet'
+df_weekly.to_parquet(output_path, engine='pyarrow', compression='zstd')
 print(f"✓ Saved: {output_path}")
 
 # ============================================================================
@@ -6,16 +6,41 @@ Focus: Market-driven signals that move weekly (not monthly macro)
 """
 import pandas as pd
 import numpy as np
-import pickle
 from pathlib import Path
 
+# Optional: bottleneck's C moving-window kernels (pandas rolling otherwise)
+try:
+    import bottleneck as bn
+    BOTTLENECK_AVAILABLE = True
+except ImportError:
+    BOTTLENECK_AVAILABLE = False
+
+def _move_mean(arr, window):
+    """Trailing moving mean down axis 0 (NaN until the window is full)"""
+    if BOTTLENECK_AVAILABLE:
+        return bn.move_mean(arr, window, axis=0)
+    frame = pd.DataFrame(arr) if arr.ndim == 2 else pd.Series(arr)
+    return frame.rolling(window).mean().to_numpy()
+
+def _move_std(arr, window):
+    """Trailing moving sample std (ddof=1) down axis 0 (NaN until the window is full)"""
+    if BOTTLENECK_AVAILABLE:
+        return bn.move_std(arr, window, axis=0, ddof=1)
+    frame = pd.DataFrame(arr) if arr.ndim == 2 else pd.Series(arr)
+    return frame.rolling(window).std().to_numpy()
+
+def _lag(arr, k):
+    """Rows shifted down by k (NaN-filled), i.e. shift(k) on a 1-D or 2-D array"""
+    out = np.full_like(arr, np.nan)
+    out[k:] = arr[:-k]
+    return out
+
 print("="*80)
 print("FX LAYER 2 - WEEKLY FEATURE ENGINEERING")
 print("="*80)
 
 # Load weekly raw data
-with open('fx_layer2_weekly_raw.pkl', 'rb') as f:
-    df_weekly = pickle.load(f)
+df_weekly = pd.read_parquet('fx_layer2_weekly_raw.parquet')
 
 print(f"\n✓ Loaded weekly data: {df_weekly.shape}")
 print(f"  Date range: {df_weekly.index.min().strftime('%Y-%m-%d')} to {df_weekly.index.max().strftime('%Y-%m-%d')}")
@@ -26,7 +51,9 @@ print(f"  Date range: {df_weekly.index.min().strftime('%Y-%m-%d')} to {df_weekly
 
 print("\n[STEP 1] Engineering pressure features...")
 
-features = pd.DataFrame(index=df_weekly.index)
+# Base features are collected as name -> values and built into one DataFrame
+# at the end, instead of inserting columns into a growing frame
+features = {}
 
 # -----------------------------------------------------------------------------
 # 1. RATE DIFFERENTIALS
@@ -136,28 +163,32 @@ print("\n[6] FX momentum features...")
 
 if 'DEXUSEU' in df_weekly.columns:
     spot = df_weekly['DEXUSEU']
+    spot_arr = spot.to_numpy(dtype=np.float64)
     
-    # Weekly returns
-    features['fx_ret_1w'] = spot.pct_change(1) * 100
-    features['fx_ret_4w'] = spot.pct_change(4) * 100
-    features['fx_ret_12w'] = spot.pct_change(12) * 100
+    # Weekly returns (simple %, all horizons from the same spot array)
+    ret_1w = (spot_arr / _lag(spot_arr, 1) - 1) * 100
+    features['fx_ret_1w'] = ret_1w
+    features['fx_ret_4w'] = (spot_arr / _lag(spot_arr, 4) - 1) * 100
+    features['fx_ret_12w'] = (spot_arr / _lag(spot_arr, 12) - 1) * 100
     
     # Moving averages
-    features['fx_ma4'] = spot.rolling(4).mean()
-    features['fx_ma12'] = spot.rolling(12).mean()
-    features['fx_ma26'] = spot.rolling(26).mean()
+    features['fx_ma4'] = _move_mean(spot_arr, 4)
+    features['fx_ma12'] = _move_mean(spot_arr, 12)
+    features['fx_ma26'] = _move_mean(spot_arr, 26)
     
-    # MA crosses
-    features['fx_ma4_cross'] = (features['fx_ma4'] > features['fx_ma12']).astype(int)
-    features['fx_ma12_cross'] = (features['fx_ma12'] > features['fx_ma26']).astype(int)
+    # MA crosses (0/1 flags: the bool result reinterpreted as int8, no cast copy)
+    features['fx_ma4_cross'] = np.greater(features['fx_ma4'], features['fx_ma12']).view(np.int8)
+    features['fx_ma12_cross'] = np.greater(features['fx_ma12'], features['fx_ma26']).view(np.int8)
     
     # Rolling volatility (4-week std of weekly returns)
-    features['fx_vol_4w'] = spot.pct_change().rolling(4).std() * 100
+    features['fx_vol_4w'] = _move_std(ret_1w, 4)
     
     print(f"  ✓ fx_ret_1w, fx_ret_4w, fx_ret_12w")
     print(f"  ✓ fx_ma4, fx_ma12, fx_ma26")
     print(f"  ✓ fx_ma_crosses, fx_vol_4w")
 
+features = pd.DataFrame(features, index=df_weekly.index)
+
 print(f"\n✓ Created {len(features.columns)} base features")
 
 # ============================================================================
@@ -166,42 +197,62 @@ print(f"\n✓ Created {len(features.columns)} base features")
 
 print("\n[STEP 2] Generating transform variants (lags, changes)...")
 
-final_features = pd.DataFrame(index=df_weekly.index)
-
+# Skip already-lagged features (ma_cross, etc) - these only get the level
+passthrough = [col for col in features.columns
+               if col.startswith('fx_ma') or col.endswith('_cross') or col.endswith('_high')]
+transform_cols = [col for col in features.columns if col not in passthrough]
+
+# Every transform runs once over the whole (weeks x features) block
+block = features[transform_cols].to_numpy(dtype=np.float64)
+lag1, lag2, lag4 = _lag(block, 1), _lag(block, 2), _lag(block, 4)
+d1w = block - lag1
+d4w = block - lag4
+
+# 12-week rolling Z-score
+z12w = (block - _move_mean(block, 12)) / _move_std(block, 12)
+
+# Weeks with any missing value (lag / rolling warm-up, gaps in the raw series)
+# are dropped with one row mask while assembling, rather than dropna on the frame
+missing = np.isnan(features[passthrough].to_numpy(dtype=np.float64)).any(axis=1)
+for arr in (block, lag1, lag2, lag4, d1w, d4w, z12w):
+    missing |= np.isnan(arr).any(axis=1)
+has_spot = 'DEXUSEU' in df_weekly.columns
+if has_spot:
+    missing |= df_weekly['DEXUSEU'].isna().to_numpy()
+keep = ~missing
+block, lag1, lag2, lag4, d1w, d4w, z12w = (arr[keep] for arr in (block, lag1, lag2, lag4, d1w, d4w, z12w))
+
+# Assemble in the original per-feature column order, one DataFrame build
+transforms = {}
+col_idx = {col: j for j, col in enumerate(transform_cols)}
 for col in features.columns:
-    # Skip already-lagged features (ma_cross, etc)
-    if col.startswith('fx_ma') or col.endswith('_cross') or col.endswith('_high'):
-        final_features[f'{col}_t'] = features[col]
-        continue
-    
     # Level (_t)
-    final_features[f'{col}_t'] = features[col]
+    transforms[f'{col}_t'] = features[col].to_numpy()[keep]
+    if col not in col_idx:
+        continue
+    j = col_idx[col]
     
     # Lags (t-1, t-2, t-4 weeks)
-    final_features[f'{col}_t1'] = features[col].shift(1)
-    final_features[f'{col}_t2'] = features[col].shift(2)
-    final_features[f'{col}_t4'] = features[col].shift(4)
+    transforms[f'{col}_t1'] = lag1[:, j]
+    transforms[f'{col}_t2'] = lag2[:, j]
+    transforms[f'{col}_t4'] = lag4[:, j]
     
     # Weekly changes
-    final_features[f'd1w_{col}'] = features[col].diff(1)
-    final_features[f'd4w_{col}'] = features[col].diff(4)
+    transforms[f'd1w_{col}'] = d1w[:, j]
+    transforms[f'd4w_{col}'] = d4w[:, j]
     
-    # 12-week rolling Z-score
-    rolling_mean = features[col].rolling(window=12).mean()
-    rolling_std = features[col].rolling(window=12).std()
-    final_features[f'z12w_{col}'] = (features[col] - rolling_mean) / rolling_std
+    transforms[f'z12w_{col}'] = z12w[:, j]
 
-print(f"✓ Engineered {len(final_features.columns)} total features (with transforms)")
+print(f"✓ Engineered {len(transforms)} total features (with transforms)")
 
 # Add target (EURUSD spot)
-if 'DEXUSEU' in df_weekly.columns:
-    final_features['spot'] = df_weekly['DEXUSEU']
+if has_spot:
+    transforms['spot'] = df_weekly['DEXUSEU'].to_numpy()[keep]
     print(f"✓ Added target: spot (EURUSD)")
 
-# Drop rows with NaN (from lags and rolling windows)
-initial_rows = len(final_features)
-final_features = final_features.dropna()
-dropped = initial_rows - len(final_features)
+final_features = pd.DataFrame(transforms, index=df_weekly.index[keep])
+
+dropped = int(missing.sum())
 print(f"\n✓ Dropped {dropped} weeks with NaN (from lags/rolling)")
 print(f"✓ Final feature set: {len(final_features)} weeks × {len(final_features.columns)} features")
 
@@ -209,9 +260,8 @@ print(f"✓ Final feature set: {len(final_features)} weeks × {len(final_feature
 # SAVE
 # ============================================================================
 
-output_path = 'fx_layer2_weekly_features.pkl'
-with open(output_path, 'wb') as f:
-    pickle.dump(final_features, f)
+output_path = 'fx_layer2_weekly_features.parquet'
+final_features.to_parquet(output_path, engine='pyarrow', compression='zstd')
 print(f"\n✓ Saved: {output_path}")
 
 # ============================================================================
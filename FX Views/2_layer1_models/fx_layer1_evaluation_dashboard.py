@@ -4,13 +4,28 @@ Compare all monthly models on proper criteria for fair value estimation
 """
 import pandas as pd
 import numpy as np
-import pickle
+import joblib
 import json
+import sys
 from pathlib import Path
 import matplotlib
 matplotlib.use('Agg')
+# Drop sub-pixel vertices and feed Agg long paths in chunks
+matplotlib.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'agg.path.chunksize': 10000,
+})
 import matplotlib.pyplot as plt
-from matplotlib.patches import Rectangle
+import matplotlib.dates as mdates
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.colors import to_rgba
+from matplotlib.lines import Line2D
+from matplotlib.patches import Rectangle, Patch
+
+# Shared helpers live one folder up (FX Views/fx_utils.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fx_utils import write_json
 
 print("="*80)
 print("FX LAYER 1 - EVALUATION DASHBOARD")
@@ -18,8 +33,8 @@ print("="*80)
 
 # Load results
 results_dir = Path('fx_layer1_outputs')
-with open(results_dir / 'all_models.pkl', 'rb') as f:
-    all_models = pickle.load(f)
+# Names / sigmas / metrics only; the prediction arrays in arrays.npz are not needed here
+all_models = joblib.load(results_dir / 'estimators.joblib')
 
 with open(results_dir / 'evaluation_summary.json', 'r') as f:
     eval_summary = json.load(f)
@@ -41,27 +56,32 @@ print("  4. RMSE (error magnitude)")
 print("  5. Economic interpretability (feature count & coherence)")
 print("\n" + "-"*80)
 
-# Create comparison dataframe
-comparison_data = []
-for key in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']:
-    model = all_models[key]
-    summary = eval_summary[key]
-    
-    row = {
-        'Model': model['name'],
-        'R² Test': summary['r2_test'] if summary['r2_test'] is not None else np.nan,
-        'RMSE Test': summary['rmse_test'] if summary['rmse_test'] is not None else np.nan,
-        'σ (Training)': summary['sigma'],
-        'In-line %': summary['regime_train']['in_line_pct'] * 100,
-        'Stretch %': summary['regime_train']['stretch_pct'] * 100,
-        'Break %': summary['regime_train']['break_pct'] * 100,
-        'FV Avg Change': summary['stability']['mean_abs_change'],
-        'FV Max Jump': summary['stability']['max_monthly_jump'],
-        'FV Change Vol': summary['stability']['change_std']
-    }
-    comparison_data.append(row)
-
-df_comparison = pd.DataFrame(comparison_data)
+MODEL_KEYS = ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']
+
+# Create comparison dataframe: one float64 array per column, filled by row
+# position (no per-row dict or dtype inference)
+summaries = [eval_summary[key] for key in MODEL_KEYS]
+n_models = len(MODEL_KEYS)
+
+COMPARISON_COLUMNS = ['R² Test', 'RMSE Test', 'σ (Training)', 'In-line %', 'Stretch %',
+                      'Break %', 'FV Avg Change', 'FV Max Jump', 'FV Change Vol']
+comparison_cols = {col: np.empty(n_models) for col in COMPARISON_COLUMNS}
+
+for i, summary in enumerate(summaries):
+    comparison_cols['R² Test'][i] = summary['r2_test'] if summary['r2_test'] is not None else np.nan
+    comparison_cols['RMSE Test'][i] = summary['rmse_test'] if summary['rmse_test'] is not None else np.nan
+    comparison_cols['σ (Training)'][i] = summary['sigma']
+    comparison_cols['In-line %'][i] = summary['regime_train']['in_line_pct'] * 100
+    comparison_cols['Stretch %'][i] = summary['regime_train']['stretch_pct'] * 100
+    comparison_cols['Break %'][i] = summary['regime_train']['break_pct'] * 100
+    comparison_cols['FV Avg Change'][i] = summary['stability']['mean_abs_change']
+    comparison_cols['FV Max Jump'][i] = summary['stability']['max_monthly_jump']
+    comparison_cols['FV Change Vol'][i] = summary['stability']['change_std']
+
+df_comparison = pd.DataFrame(
+    {'Model': [all_models[key]['name'] for key in MODEL_KEYS], **comparison_cols},
+    index=MODEL_KEYS
+)
 
 # Print comprehensive table
 print("\n" + "="*130)
@@ -101,62 +121,48 @@ print("\n" + "="*80)
 print("AUTOMATED SCORING (for guidance)")
 print("="*80)
 
-scores = {}
-for key in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']:
-    summary = eval_summary[key]
-    
-    # Criteria 1: Test R² (40 points max)
-    r2_test = summary['r2_test'] if summary['r2_test'] is not None else 0
-    r2_score = max(0, min(40, r2_test * 100))  # Cap at 40
-    
-    # Criteria 2: Regime frequency (30 points)
-    # Ideal: ~68% in-line, ~27% stretch, ~5% break
-    in_line = summary['regime_train']['in_line_pct']
-    stretch = summary['regime_train']['stretch_pct']
-    break_pct = summary['regime_train']['break_pct']
-    
-    regime_score = 30 - (
-        abs(in_line - 0.68) * 100 +  # Penalize deviation from 68%
-        abs(stretch - 0.27) * 100 +  # Penalize deviation from 27%
-        abs(break_pct - 0.05) * 100  # Penalize deviation from 5%
-    )
-    regime_score = max(0, regime_score)
-    
-    # Criteria 3: Stability (20 points)
-    # Lower FV change vol is better
-    change_vol = summary['stability']['change_std']
-    stability_score = max(0, 20 - change_vol * 1000)  # Scaled penalty
-    
-    # Criteria 4: RMSE (10 points)
-    rmse = summary['rmse_test'] if summary['rmse_test'] is not None else 1.0
-    rmse_score = max(0, 10 - rmse * 200)  # Scaled penalty
-    
-    total_score = r2_score + regime_score + stability_score + rmse_score
-    
-    scores[key] = {
-        'r2_score': r2_score,
-        'regime_score': regime_score,
-        'stability_score': stability_score,
-        'rmse_score': rmse_score,
-        'total_score': total_score
-    }
+# All five models scored at once as column expressions on the comparison table
+r2_test = df_comparison['R² Test'].fillna(0)
+rmse = df_comparison['RMSE Test'].fillna(1.0)
+
+scores = pd.DataFrame(index=df_comparison.index)
+
+# Criteria 1: Test R² (40 points max)
+scores['r2_score'] = np.clip(r2_test * 100, 0, 40)  # Cap at 40
+
+# Criteria 2: Regime frequency (30 points)
+# Ideal: ~68% in-line, ~27% stretch, ~5% break (penalize each deviation)
+regime_penalty = (
+    (df_comparison['In-line %'] - 68).abs() +
+    (df_comparison['Stretch %'] - 27).abs() +
+    (df_comparison['Break %'] - 5).abs()
+)
+scores['regime_score'] = np.clip(30 - regime_penalty, 0, None)
+
+# Criteria 3: Stability (20 points)
+# Lower FV change vol is better
+scores['stability_score'] = np.clip(20 - df_comparison['FV Change Vol'] * 1000, 0, None)  # Scaled penalty
+
+# Criteria 4: RMSE (10 points)
+scores['rmse_score'] = np.clip(10 - rmse * 200, 0, None)  # Scaled penalty
+
+scores['total_score'] = scores[['r2_score', 'regime_score', 'stability_score', 'rmse_score']].sum(axis=1)
 
 # Print scores
 print(f"\n{'Model':<40} {'R² (40)':>10} {'Regime (30)':>12} {'Stab (20)':>12} {'RMSE (10)':>12} {'TOTAL':>10}")
 print("-" * 105)
-for key in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']:
+for key, s in scores.iterrows():
     model_name = all_models[key]['name']
-    s = scores[key]
     print(f"{model_name:<40} {s['r2_score']:>10.1f} {s['regime_score']:>12.1f} {s['stability_score']:>12.1f} {s['rmse_score']:>12.1f} {s['total_score']:>10.1f}")
 
 # Find winner
-best_model_key = max(scores.keys(), key=lambda k: scores[k]['total_score'])
+best_model_key = MODEL_KEYS[scores['total_score'].to_numpy().argmax()]
 best_model = all_models[best_model_key]
 
 print("\n" + "="*80)
 print(f"🏆 RECOMMENDED MODEL: {best_model['name'].upper()}")
 print("="*80)
-print(f"\nScore: {scores[best_model_key]['total_score']:.1f}/100")
+print(f"\nScore: {scores.at[best_model_key, 'total_score']:.1f}/100")
 print(f"Test R²: {eval_summary[best_model_key]['r2_test']:.3f}")
 print(f"RMSE: {eval_summary[best_model_key]['rmse_test']:.5f}")
 print(f"Training σ: {eval_summary[best_model_key]['sigma']:.5f}")
@@ -178,25 +184,50 @@ fig, axes = plt.subplots(3, 2, figsize=(16, 14))
 fig.suptitle('Layer 1 Model Comparison - Fair Value Estimates (2020+)', 
              fontsize=16, fontweight='bold', color='white')
 
-for idx, key in enumerate(['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']):
+# Each panel is two collections (σ bands, FV + spot lines) rather than four
+# separate artists, so the legend is built from proxies shared by all panels
+BAND_COLORS = [to_rgba('gray', 0.15), to_rgba('lightblue', 0.25)]
+legend_handles = [
+    Patch(facecolor=BAND_COLORS[0], label='±2σ'),
+    Patch(facecolor=BAND_COLORS[1], label='±1σ'),
+    Line2D([], [], linestyle='--', color='blue', linewidth=1.5, label='Fair Value'),
+    Line2D([], [], linestyle='-', color='black', linewidth=2, label='Spot'),
+]
+
+for idx, key in enumerate(MODEL_KEYS):
     ax = axes[idx // 2, idx % 2]
     
-    # Load predictions
-    pred_df = pd.read_csv(results_dir / f'{key}_predictions.csv', parse_dates=['date'])
-    pred_df = pred_df[pred_df['date'] >= '2020-01-01']
+    # Load predictions (only the columns plotted; the σ bands are rebuilt
+    # from the saved σ rather than read as four more columns)
+    # (CSV only for outputs written before the Parquet copy existed)
+    pred_path = results_dir / f'{key}_predictions.parquet'
+    if pred_path.exists():
+        pred_df = pd.read_parquet(pred_path, columns=['date', 'spot', 'fair_value'])
+    else:
+        pred_df = pd.read_csv(pred_path.with_suffix('.csv'),
+                              usecols=['date', 'spot', 'fair_value'], engine='pyarrow')
+    dates = pred_df['date'].to_numpy(dtype='datetime64[ns]')
+    mask_2020 = dates >= np.datetime64('2020-01-01')
+    dates = dates[mask_2020]
+    fair_value = pred_df['fair_value'].to_numpy()[mask_2020]
+    spot = pred_df['spot'].to_numpy()[mask_2020]
     
     model_name = all_models[key]['name']
     sigma = all_models[key]['sigma']
     
-    # Plot bands
-    ax.fill_between(pred_df['date'], pred_df['fv_minus_2sigma'], pred_df['fv_plus_2sigma'],
-                     alpha=0.15, color='gray', label='±2σ')
-    ax.fill_between(pred_df['date'], pred_df['fv_minus_1sigma'], pred_df['fv_plus_1sigma'],
-                     alpha=0.25, color='lightblue', label='±1σ')
+    # Plot bands (each a closed polygon: lower edge, then upper edge reversed)
+    x = mdates.date2num(dates)
+    x_loop = np.concatenate([x, x[::-1]])
+    bands = [np.column_stack([x_loop, np.concatenate([fair_value - k * sigma, (fair_value + k * sigma)[::-1]])])
+             for k in (2, 1)]
+    ax.add_collection(PolyCollection(bands, facecolors=BAND_COLORS, edgecolors='none', zorder=1))
     
     # Plot FV and spot
-    ax.plot(pred_df['date'], pred_df['fair_value'], '--', color='blue', linewidth=1.5, label='Fair Value')
-    ax.plot(pred_df['date'], pred_df['spot'], '-', color='black', linewidth=2, label='Spot')
+    lines = np.stack([np.column_stack([x, fair_value]), np.column_stack([x, spot])])
+    ax.add_collection(LineCollection(lines, colors=['blue', 'black'], linewidths=[1.5, 2],
+                                     linestyles=['--', '-'], zorder=2))
+    ax.xaxis_date()
+    ax.autoscale_view()
     
     # Mark test period
     ax.axvline(pd.Timestamp('2025-01-01'), color='red', linestyle=':', alpha=0.5, linewidth=1)
@@ -205,7 +236,7 @@ for idx, key in enumerate(['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'tw
     ax.set_title(f"{model_name} (R²={eval_summary[key]['r2_test']:.3f})", 
                 fontsize=11, fontweight='bold', color='white')
     ax.set_ylabel('EURUSD', fontsize=9, color='white')
-    ax.legend(loc='upper left', fontsize=8)
+    ax.legend(handles=legend_handles, loc='upper left', fontsize=8)
     ax.grid(True, alpha=0.3)
     ax.set_facecolor('#0a0a0a')
     ax.tick_params(colors='white', labelsize=8)
@@ -218,26 +249,26 @@ for idx, key in enumerate(['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'tw
 axes[2, 1].remove()
 
 # Add recommendation text in empty space
-fig.text(0.72, 0.22, f"🏆 RECOMMENDED\n\n{best_model['name']}\n\nScore: {scores[best_model_key]['total_score']:.0f}/100\nR²: {eval_summary[best_model_key]['r2_test']:.3f}",
+fig.text(0.72, 0.22, f"🏆 RECOMMENDED\n\n{best_model['name']}\n\nScore: {scores.at[best_model_key, 'total_score']:.0f}/100\nR²: {eval_summary[best_model_key]['r2_test']:.3f}",
          fontsize=14, fontweight='bold', color='#00ff80',
          bbox=dict(boxstyle='round,pad=1', facecolor='black', edgecolor='#00ff80', linewidth=2),
          ha='center', va='center')
 
 fig.patch.set_facecolor('#0a0a0a')
 plt.tight_layout(rect=[0, 0, 1, 0.97])
-plt.savefig(results_dir / 'layer1_comparison_fv.png', dpi=300, facecolor='#0a0a0a')
-plt.close()
-print(f"✓ Saved: {results_dir / 'layer1_comparison_fv.png'}")
+chart_path = results_dir / 'layer1_comparison_fv.png'
+fig.savefig(chart_path, dpi=300, facecolor='#0a0a0a')
+plt.close(fig)
+print(f"✓ Saved: {chart_path}")
 
 # Chart 2: Regime Distribution Comparison
 fig, ax = plt.subplots(figsize=(12, 7))
 fig.suptitle('Layer 1 Model Comparison - Regime Distribution (Training Period)',
              fontsize=14, fontweight='bold', color='white')
 
-model_names = [all_models[k]['name'] for k in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']]
-in_line = [eval_summary[k]['regime_train']['in_line_pct'] * 100 for k in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']]
-stretch = [eval_summary[k]['regime_train']['stretch_pct'] * 100 for k in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']]
-break_pct = [eval_summary[k]['regime_train']['break_pct'] * 100 for k in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']]
+# Bar heights sliced from the comparison table built above (one row per model)
+model_names = df_comparison['Model'].tolist()
+in_line, stretch, break_pct = df_comparison[['In-line %', 'Stretch %', 'Break %']].to_numpy().T
 
 x = np.arange(len(model_names))
 width = 0.25
@@ -264,9 +295,10 @@ for spine in ax.spines.values():
 
 fig.patch.set_facecolor('#0a0a0a')
 plt.tight_layout()
-plt.savefig(results_dir / 'layer1_comparison_regimes.png', dpi=300, facecolor='#0a0a0a')
-plt.close()
-print(f"✓ Saved: {results_dir / 'layer1_comparison_regimes.png'}")
+chart_path = results_dir / 'layer1_comparison_regimes.png'
+fig.savefig(chart_path, dpi=150, facecolor='#0a0a0a')  # bar chart: 150 dpi is plenty
+plt.close(fig)
+print(f"✓ Saved: {chart_path}")
 
 # Chart 3: Stability Comparison
 fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
@@ -274,7 +306,7 @@ fig.suptitle('Layer 1 Model Comparison - Fair Value Stability',
              fontsize=14, fontweight='bold', color='white')
 
 # Mean absolute change
-mean_changes = [eval_summary[k]['stability']['mean_abs_change'] for k in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']]
+mean_changes, change_vols = df_comparison[['FV Avg Change', 'FV Change Vol']].to_numpy().T
 ax1.barh(model_names, mean_changes, color='cyan', alpha=0.7)
 ax1.set_xlabel('Mean Absolute Monthly Change', fontsize=10, color='white')
 ax1.set_title('Lower is Better (Smoother FV)', fontsize=11, color='white')
@@ -285,7 +317,6 @@ for spine in ax1.spines.values():
     spine.set_color('white')
 
 # Change volatility
-change_vols = [eval_summary[k]['stability']['change_std'] for k in ['ridge', 'lasso', 'elasticnet', 'xgboost_single', 'twostage']]
 ax2.barh(model_names, change_vols, color='orange', alpha=0.7)
 ax2.set_xlabel('FV Change Volatility (Std Dev)', fontsize=10, color='white')
 ax2.set_title('Lower is Better (More Stable)', fontsize=11, color='white')
@@ -297,9 +328,10 @@ for spine in ax2.spines.values():
 
 fig.patch.set_facecolor('#0a0a0a')
 plt.tight_layout()
-plt.savefig(results_dir / 'layer1_comparison_stability.png', dpi=300, facecolor='#0a0a0a')
-plt.close()
-print(f"✓ Saved: {results_dir / 'layer1_comparison_stability.png'}")
+chart_path = results_dir / 'layer1_comparison_stability.png'
+fig.savefig(chart_path, dpi=150, facecolor='#0a0a0a')
+plt.close(fig)
+print(f"✓ Saved: {chart_path}")
 
 # ============================================================================
 # SAVE RECOMMENDATION
@@ -308,7 +340,7 @@ print(f"✓ Saved: {results_dir / 'layer1_comparison_stability.png'}")
 recommendation = {
     'selected_model': best_model_key,
     'model_name': best_model['name'],
-    'score': float(scores[best_model_key]['total_score']),
+    'score': float(scores.at[best_model_key, 'total_score']),
     'metrics': {
         'r2_test': float(eval_summary[best_model_key]['r2_test']) if eval_summary[best_model_key]['r2_test'] is not None else None,
         'rmse_test': float(eval_summary[best_model_key]['rmse_test']) if eval_summary[best_model_key]['rmse_test'] is not None else None,
@@ -318,8 +350,7 @@ recommendation = {
     'stability': eval_summary[best_model_key]['stability']
 }
 
-with open(results_dir / 'layer1_recommendation.json', 'w') as f:
-    json.dump(recommendation, f, indent=2)
+write_json(results_dir / 'layer1_recommendation.json', recommendation)
 
 print(f"\n✓ Saved recommendation: {results_dir / 'layer1_recommendation.json'}")
 
@@ -0,0 +1,129 @@
+"""
+FX LAYER 1 - REGIME / STABILITY METRICS
+numba kernels with NumPy fallbacks; both backends return the same values:
+  - NaN residuals sit in no regime (but count in n) and make median / max NaN
+  - Moments that need more points than given (std of < 2 values) are NaN
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Shared helpers live one folder up (FX Views/fx_utils.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fx_utils import njit, NUMBA_AVAILABLE
+
+@njit(cache=True)
+def _regime_stats_kernel(residuals, sigma):
+    """One pass over |z|: regime counts and max, then the median"""
+    n = residuals.size
+    abs_z = np.empty(n)
+    in_line = 0
+    stretch = 0
+    break_regime = 0
+    has_nan = False
+    max_abs_z = 0.0
+    for i in range(n):
+        z = abs(residuals[i] / sigma)
+        abs_z[i] = z
+        if z != z:
+            has_nan = True
+        elif z >= 2.0:
+            break_regime += 1
+        elif z >= 1.0:
+            stretch += 1
+        else:
+            in_line += 1
+        if z > max_abs_z:
+            max_abs_z = z
+    if has_nan:
+        return in_line, stretch, break_regime, np.nan, np.nan
+    return in_line, stretch, break_regime, np.median(abs_z), max_abs_z
+
+def _regime_stats_numpy(residuals, sigma):
+    """Vectorised fallback for _regime_stats_kernel when numba is missing"""
+    abs_z = np.abs(residuals / sigma)
+    # 0/1/2/3 = in-line/stretch/break/NaN packed into one uint8 code array
+    regime = (abs_z >= 1.0).view(np.uint8)
+    regime += (abs_z >= 2.0).view(np.uint8)
+    regime += np.isnan(abs_z).view(np.uint8) * np.uint8(3)
+    in_line, stretch, break_regime, n_nan = np.bincount(regime, minlength=4)
+    if n_nan:
+        return in_line, stretch, break_regime, np.nan, np.nan
+    return in_line, stretch, break_regime, np.median(abs_z), abs_z.max()
+
+def compute_regime_stats(residuals, sigma):
+    """Compute regime distribution from residuals"""
+    residuals = np.ascontiguousarray(residuals, dtype=np.float64)
+    n = residuals.size
+    if n == 0:
+        return dict.fromkeys(['in_line_pct', 'stretch_pct', 'break_pct', 'median_abs_z', 'max_abs_z'], np.nan)
+    regime_stats = _regime_stats_kernel if NUMBA_AVAILABLE else _regime_stats_numpy
+    in_line, stretch, break_regime, median_abs_z, max_abs_z = regime_stats(residuals, float(sigma))
+
+    return {
+        'in_line_pct': in_line / n,
+        'stretch_pct': stretch / n,
+        'break_pct': break_regime / n,
+        'median_abs_z': median_abs_z,
+        'max_abs_z': max_abs_z
+    }
+
+@njit(cache=True)
+def _stability_kernel(fair_value):
+    """FV level / monthly-change moments without materialising the changes"""
+    n = fair_value.size
+    if n < 2:
+        return np.nan, np.nan, np.nan, np.nan
+    level_sum = 0.0
+    change_sum = 0.0
+    abs_change_sum = 0.0
+    max_jump = 0.0
+    for i in range(n):
+        level_sum += fair_value[i]
+        if i > 0:
+            change = fair_value[i] - fair_value[i - 1]
+            change_sum += change
+            abs_change_sum += abs(change)
+            # A NaN jump sticks (nothing compares greater than NaN), as in max()
+            if abs(change) > max_jump or change != change:
+                max_jump = abs(change)
+    level_mean = level_sum / n
+    change_mean = change_sum / (n - 1)
+
+    # Second pass for the variances (sum of squared deviations stays accurate)
+    level_ss = 0.0
+    change_ss = 0.0
+    for i in range(n):
+        level_ss += (fair_value[i] - level_mean) ** 2
+        if i > 0:
+            change_ss += (fair_value[i] - fair_value[i - 1] - change_mean) ** 2
+
+    fv_std = np.sqrt(level_ss / (n - 1))
+    change_std = np.sqrt(change_ss / (n - 2)) if n > 2 else np.nan
+    return fv_std, change_std, max_jump, abs_change_sum / (n - 1)
+
+def _stability_numpy(fair_value):
+    """Vectorised fallback for _stability_kernel when numba is missing"""
+    n = fair_value.size
+    if n < 2:
+        return np.nan, np.nan, np.nan, np.nan
+    changes = np.diff(fair_value)
+    abs_changes = np.abs(changes)
+    change_std = changes.std(ddof=1) if n > 2 else np.nan
+    return fair_value.std(ddof=1), change_std, abs_changes.max(), abs_changes.mean()
+
+def compute_stability_metrics(fair_value):
+    """Measure FV stability - want smooth, not jumpy"""
+    # Volatility of FV itself (not a bug - want stable FV), volatility of
+    # monthly FV changes (want low), max single-month jump, mean abs change
+    stability = _stability_kernel if NUMBA_AVAILABLE else _stability_numpy
+    fv_std, change_std, max_jump, mean_abs_change = stability(
+        np.ascontiguousarray(fair_value, dtype=np.float64))
+
+    return {
+        'fv_std': fv_std,
+        'change_std': change_std,
+        'max_monthly_jump': max_jump,
+        'mean_abs_change': mean_abs_change
+    }
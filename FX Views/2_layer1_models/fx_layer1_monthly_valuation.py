@@ -10,16 +10,26 @@ Tests multiple model approaches and evaluates on proper criteria:
 import pandas as pd
 import numpy as np
 import pickle
-from sklearn.linear_model import RidgeCV, LassoCV, ElasticNetCV
-from sklearn.metrics import mean_squared_error, r2_score
+import joblib
+from sklearn.linear_model import RidgeCV, ElasticNetCV, Lasso, ElasticNet
 from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
 from xgboost import XGBRegressor
 import matplotlib
 matplotlib.use('Agg')
 import matplotlib.pyplot as plt
 import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+# Shared helpers live one folder up (FX Views/fx_utils.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from fx_utils import write_json
+# Regime / stability metrics (numba kernels, NumPy fallbacks)
+from fx_layer1_metrics import compute_regime_stats, compute_stability_metrics
+
 print("="*80)
 print("FX LAYER 1 - MONTHLY MACRO VALUATION MODEL")
 print("="*80)
@@ -44,8 +54,9 @@ print(f"  Range: {df.index.min().strftime('%Y-%m')} to {df.index.max().strftime(
 print("\n[2] Train/Test split...")
 
 TRAIN_END = '2024-12-31'
-train_df = df[df.index <= TRAIN_END]
-test_df = df[df.index > TRAIN_END]
+train_mask = df.index <= TRAIN_END
+train_df = df[train_mask]
+test_df = df[~train_mask]
 
 X_train = train_df.drop('spot', axis=1)
 y_train = train_df['spot']
@@ -55,6 +66,33 @@ y_test = test_df['spot']
 X_full = df.drop('spot', axis=1)
 y_full = df['spot']
 
+# Each split materialised once as contiguous float64 arrays: every fit,
+# predict, metric and residual below uses these (no repeated DataFrame
+# conversion / validation copies)
+X_train_np = np.ascontiguousarray(X_train.to_numpy(dtype=np.float64))
+X_test_np = np.ascontiguousarray(X_test.to_numpy(dtype=np.float64))
+X_full_np = np.ascontiguousarray(X_full.to_numpy(dtype=np.float64))
+y_train_arr = y_train.to_numpy(dtype=np.float64)
+y_test_arr = y_test.to_numpy(dtype=np.float64)
+y_full_arr = y_full.to_numpy(dtype=np.float64)
+
+# XGBoost bins and predicts on float32 whatever it is given: cast once here
+# instead of on every fit / predict (the linear models stay on float64).
+# C-contiguous float32 matrices go straight into XGBoost's quantile DMatrix
+# and inplace_predict without the pandas adapter or an internal copy
+X_train_xgb = X_train_np.astype(np.float32)
+X_test_xgb = X_test_np.astype(np.float32)
+X_full_xgb = X_full_np.astype(np.float32)
+
+# Feature names as a plain array for fancy-indexed top-feature lookups
+feature_names = X_train.columns.to_numpy()
+
+# Total sums of squares for R²: fixed per split, so taken once for all models
+y_train_centred = y_train_arr - y_train_arr.mean()
+y_test_centred = y_test_arr - y_test_arr.mean() if len(X_test) > 0 else np.array([])
+y_train_ss = y_train_centred.dot(y_train_centred)
+y_test_ss = y_test_centred.dot(y_test_centred)
+
 print(f"  Train: {len(X_train)} months (to {TRAIN_END})")
 print(f"  Test:  {len(X_test)} months ({test_df.index.min().strftime('%Y-%m')} onward)")
 
@@ -62,58 +100,84 @@ print(f"  Test:  {len(X_test)} months ({test_df.index.min().strftime('%Y-%m')} o
 # HELPER FUNCTIONS
 # ============================================================================
 
-def compute_regime_stats(residuals, sigma):
-    """Compute regime distribution from residuals"""
-    z_scores = residuals / sigma
-    
-    in_line = (np.abs(z_scores) < 1.0).sum() / len(z_scores)
-    stretch = ((np.abs(z_scores) >= 1.0) & (np.abs(z_scores) < 2.0)).sum() / len(z_scores)
-    break_regime = (np.abs(z_scores) >= 2.0).sum() / len(z_scores)
-    
+def _r2_rmse(resid, total_ss):
+    """R² and RMSE from one residual dot product (NaN for an empty split)"""
+    if resid.size == 0:
+        return np.nan, np.nan
+    resid_ss = resid.dot(resid)
+    return 1.0 - resid_ss / total_ss, np.sqrt(resid_ss / resid.size)
+
+def compute_fit_metrics(train_resid, test_resid):
+    """Train / test R² and RMSE from the residuals each model already keeps"""
+    r2_train, rmse_train = _r2_rmse(train_resid, y_train_ss)
+    r2_test, rmse_test = _r2_rmse(test_resid, y_test_ss)
     return {
-        'in_line_pct': in_line,
-        'stretch_pct': stretch,
-        'break_pct': break_regime,
-        'median_abs_z': np.median(np.abs(z_scores)),
-        'max_abs_z': np.max(np.abs(z_scores))
+        'r2_train': r2_train,
+        'r2_test': r2_test,
+        'rmse_train': rmse_train,
+        'rmse_test': rmse_test
     }
 
-def compute_stability_metrics(fair_value_series):
-    """Measure FV stability - want smooth, not jumpy"""
-    # Monthly changes
-    fv_changes = fair_value_series.diff()
-    
-    # Volatility of FV itself (not a bug - want stable FV)
-    fv_volatility = fair_value_series.std()
-    
-    # Volatility of FV changes (want low)
-    change_volatility = fv_changes.std()
-    
-    # Max single-month jump
-    max_jump = fv_changes.abs().max()
-    
-    return {
-        'fv_std': fv_volatility,
-        'change_std': change_volatility,
-        'max_monthly_jump': max_jump,
-        'mean_abs_change': fv_changes.abs().mean()
-    }
+def _top_k_desc(values, n):
+    """Indices of the n largest values, largest first (partition, then sort n)"""
+    n = min(n, values.size)
+    idx = np.argpartition(values, -n)[-n:]
+    return idx[np.argsort(values[idx])[::-1]]
 
 def get_top_features(model, feature_names, n=15):
-    """Extract most important features"""
+    """Extract most important features (feature_names: ndarray of names)"""
     if hasattr(model, 'coef_'):
         # Linear models
         coef_abs = np.abs(model.coef_)
-        top_idx = np.argsort(coef_abs)[-n:][::-1]
-        return [(feature_names[i], model.coef_[i]) for i in top_idx]
+        top_idx = _top_k_desc(coef_abs, n)
+        return list(zip(feature_names[top_idx], model.coef_[top_idx]))
     elif hasattr(model, 'feature_importances_'):
         # Tree models
         importances = model.feature_importances_
-        top_idx = np.argsort(importances)[-n:][::-1]
-        return [(feature_names[i], importances[i]) for i in top_idx]
+        top_idx = _top_k_desc(importances, n)
+        return list(zip(feature_names[top_idx], importances[top_idx]))
     else:
         return []
 
+def augment_with_m1(X_xgb, m1_z):
+    """Two-stage M2 input: [features | m1_residual_z | regime_break | regime_stretch] as float32"""
+    n, k = X_xgb.shape
+    aug = np.empty((n, k + 3), dtype=np.float32)
+    aug[:, :k] = X_xgb
+    aug[:, k] = m1_z
+    abs_z = np.abs(m1_z)
+    regime_break = abs_z > 2.0
+    aug[:, k + 1] = regime_break
+    aug[:, k + 2] = (abs_z > 1.0) & ~regime_break
+    return aug
+
+# ============================================================================
+# BACKGROUND FIT: XGBOOST SINGLE-STAGE
+# ============================================================================
+
+# Model 4 depends on nothing the linear models produce, so it trains on a
+# worker thread (XGBoost releases the GIL) while the L1 grid fits on the
+# main thread; the two-stage M2 needs Ridge and stays sequential.
+# The cores are split between the two so neither oversubscribes the machine
+N_CORES = os.cpu_count() or 1
+XGB_SINGLE_JOBS = max(1, N_CORES // 2)
+L1_CV_JOBS = max(1, N_CORES - XGB_SINGLE_JOBS)
+
+# Use moderate regularization to prevent overfitting
+xgb_single = XGBRegressor(
+    n_estimators=300,
+    learning_rate=0.05,
+    max_depth=3,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    reg_lambda=10.0,  # Stronger L2
+    reg_alpha=5.0,    # Add L1
+    objective="reg:squarederror",
+    tree_method="hist",
+    n_jobs=XGB_SINGLE_JOBS,
+    random_state=42
+)
+
 # ============================================================================
 # MODEL 1: RIDGE BASELINE
 # ============================================================================
@@ -122,19 +186,20 @@ print("\n" + "="*80)
 print("[MODEL 1/5] RIDGE BASELINE")
 print("="*80)
 
-ridge = RidgeCV(alphas=[0.01, 0.1, 1, 10, 100, 500, 1000], cv=5)
-ridge.fit(X_train, y_train)
+# Efficient leave-one-out (GCV): one SVD of X_train scores every alpha in closed form
+ridge = RidgeCV(alphas=[0.01, 0.1, 1, 10, 100, 500, 1000], gcv_mode='svd')
+ridge.fit(X_train_np, y_train_arr)
 
-ridge_train_pred = ridge.predict(X_train)
-ridge_test_pred = ridge.predict(X_test) if len(X_test) > 0 else np.array([])
-ridge_full_pred = ridge.predict(X_full)
+ridge_train_pred = ridge.predict(X_train_np)
+ridge_test_pred = ridge.predict(X_test_np) if len(X_test) > 0 else np.array([])
+ridge_full_pred = ridge.predict(X_full_np)
 
 # Training residuals for sigma
-ridge_train_resid = y_train.values - ridge_train_pred
+ridge_train_resid = y_train_arr - ridge_train_pred
 ridge_sigma = ridge_train_resid.std()
 
 # Test performance
-ridge_test_resid = y_test.values - ridge_test_pred if len(X_test) > 0 else np.array([])
+ridge_test_resid = y_test_arr - ridge_test_pred if len(X_test) > 0 else np.array([])
 
 ridge_results = {
     'name': 'Ridge Baseline',
@@ -147,13 +212,10 @@ ridge_results = {
     'test_resid': ridge_test_resid,
     'metrics': {
         'best_alpha': ridge.alpha_,
-        'r2_train': r2_score(y_train, ridge_train_pred),
-        'r2_test': r2_score(y_test, ridge_test_pred) if len(X_test) > 0 else np.nan,
-        'rmse_train': np.sqrt(mean_squared_error(y_train, ridge_train_pred)),
-        'rmse_test': np.sqrt(mean_squared_error(y_test, ridge_test_pred)) if len(X_test) > 0 else np.nan,
+        **compute_fit_metrics(ridge_train_resid, ridge_test_resid),
         'regime_stats_train': compute_regime_stats(ridge_train_resid, ridge_sigma),
         'regime_stats_test': compute_regime_stats(ridge_test_resid, ridge_sigma) if len(X_test) > 0 else {},
-        'stability': compute_stability_metrics(pd.Series(ridge_full_pred, index=y_full.index))
+        'stability': compute_stability_metrics(ridge_full_pred)
     }
 }
 
@@ -171,7 +233,7 @@ print(f"\n  FV Stability:")
 print(f"    Mean monthly change: {ridge_results['metrics']['stability']['mean_abs_change']:.5f}")
 print(f"    Max monthly jump:    {ridge_results['metrics']['stability']['max_monthly_jump']:.5f}")
 
-top_features = get_top_features(ridge, X_train.columns, 10)
+top_features = get_top_features(ridge, feature_names, 10)
 print(f"\n  Top 10 features:")
 for feat, coef in top_features:
     print(f"    {feat:40s} {coef:+.6f}")
@@ -184,22 +246,47 @@ print("\n" + "="*80)
 print("[MODEL 2/5] LASSO (L1 Regularization)")
 print("="*80)
 
-# Standardize for Lasso
+# Standardize for Lasso (and ElasticNet below): one scaled copy of each
+# split, shared by both models
 scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test) if len(X_test) > 0 else np.array([])
-X_full_scaled = scaler.transform(X_full)
-
-lasso = LassoCV(alphas=[0.00001, 0.0001, 0.001, 0.01, 0.1], cv=5, max_iter=10000)
-lasso.fit(X_train_scaled, y_train)
+X_train_scaled = scaler.fit_transform(X_train_np)
+X_test_scaled = scaler.transform(X_test_np) if len(X_test) > 0 else np.array([])
+X_full_scaled = scaler.transform(X_full_np)
+
+# One cross-validation pass serves Lasso and ElasticNet: Lasso is ElasticNet
+# with l1_ratio=1, scored as the last row of the shared grid
+# (precomputed Gram matrix: far more months than features)
+L1_ALPHAS = [0.00001, 0.0001, 0.001, 0.01, 0.1]
+ENET_L1_RATIOS = [.1, .3, .5, .7, .9, .95, .99]
+
+l1_cv = ElasticNetCV(
+    alphas=L1_ALPHAS,
+    l1_ratio=ENET_L1_RATIOS + [1.0],
+    cv=5,
+    max_iter=10000,
+    precompute=True,
+    n_jobs=L1_CV_JOBS
+)
+# The (l1_ratio, fold) paths run one per core of their share; single-threaded
+# BLAS inside each stops the workers oversubscribing the machine. The pool
+# is joined on exit, and result() re-raises anything the XGBoost fit threw
+with ThreadPoolExecutor(max_workers=1) as fit_pool, threadpool_limits(limits=1, user_api='blas'):
+    xgb_single_future = fit_pool.submit(xgb_single.fit, X_train_xgb, y_train_arr, verbose=False)
+    l1_cv.fit(X_train_scaled, y_train_arr)
+xgb_single_future.result()
+cv_mse = l1_cv.mse_path_.mean(axis=2)  # (l1_ratio, alpha), mean over folds
+cv_alphas = np.broadcast_to(l1_cv.alphas_, cv_mse.shape)
+
+lasso = Lasso(alpha=cv_alphas[-1, cv_mse[-1].argmin()], max_iter=10000, precompute=True)
+lasso.fit(X_train_scaled, y_train_arr)
 
 lasso_train_pred = lasso.predict(X_train_scaled)
 lasso_test_pred = lasso.predict(X_test_scaled) if len(X_test) > 0 else np.array([])
 lasso_full_pred = lasso.predict(X_full_scaled)
 
-lasso_train_resid = y_train.values - lasso_train_pred
+lasso_train_resid = y_train_arr - lasso_train_pred
 lasso_sigma = lasso_train_resid.std()
-lasso_test_resid = y_test.values - lasso_test_pred if len(X_test) > 0 else np.array([])
+lasso_test_resid = y_test_arr - lasso_test_pred if len(X_test) > 0 else np.array([])
 
 n_features_selected = np.sum(np.abs(lasso.coef_) > 1e-5)
 
@@ -214,19 +301,16 @@ lasso_results = {
     'train_resid': lasso_train_resid,
     'test_resid': lasso_test_resid,
     'metrics': {
-        'best_alpha': lasso.alpha_,
+        'best_alpha': lasso.alpha,
         'n_features_selected': n_features_selected,
-        'r2_train': r2_score(y_train, lasso_train_pred),
-        'r2_test': r2_score(y_test, lasso_test_pred) if len(X_test) > 0 else np.nan,
-        'rmse_train': np.sqrt(mean_squared_error(y_train, lasso_train_pred)),
-        'rmse_test': np.sqrt(mean_squared_error(y_test, lasso_test_pred)) if len(X_test) > 0 else np.nan,
+        **compute_fit_metrics(lasso_train_resid, lasso_test_resid),
         'regime_stats_train': compute_regime_stats(lasso_train_resid, lasso_sigma),
         'regime_stats_test': compute_regime_stats(lasso_test_resid, lasso_sigma) if len(X_test) > 0 else {},
-        'stability': compute_stability_metrics(pd.Series(lasso_full_pred, index=y_full.index))
+        'stability': compute_stability_metrics(lasso_full_pred)
     }
 }
 
-print(f"  Best alpha: {lasso.alpha_:.5f}")
+print(f"  Best alpha: {lasso.alpha:.5f}")
 print(f"  Features selected: {n_features_selected}/{len(X_train.columns)}")
 print(f"  R² train: {lasso_results['metrics']['r2_train']:.3f}")
 print(f"  R² test:  {lasso_results['metrics']['r2_test']:.3f}" if len(X_test) > 0 else "")
@@ -237,7 +321,7 @@ print(f"    In-line (<1σ):  {lasso_results['metrics']['regime_stats_train']['in
 print(f"    Stretch (1-2σ): {lasso_results['metrics']['regime_stats_train']['stretch_pct']:.1%}")
 print(f"    Break (>2σ):    {lasso_results['metrics']['regime_stats_train']['break_pct']:.1%}")
 
-top_features = get_top_features(lasso, X_train.columns, 10)
+top_features = get_top_features(lasso, feature_names, 10)
 print(f"\n  Top 10 features (selected):")
 for feat, coef in top_features:
     if abs(coef) > 1e-5:
@@ -251,21 +335,23 @@ print("\n" + "="*80)
 print("[MODEL 3/5] ELASTIC NET (L1 + L2)")
 print("="*80)
 
-enet = ElasticNetCV(
-    alphas=[0.00001, 0.0001, 0.001, 0.01, 0.1],
-    l1_ratio=[.1, .3, .5, .7, .9, .95, .99],
-    cv=5,
-    max_iter=10000
+# Best (l1_ratio, alpha) from the shared CV grid, excluding the pure-L1 row
+enet_l1_idx, enet_alpha_idx = np.unravel_index(cv_mse[:-1].argmin(), cv_mse[:-1].shape)
+enet = ElasticNet(
+    alpha=cv_alphas[enet_l1_idx, enet_alpha_idx],
+    l1_ratio=ENET_L1_RATIOS[enet_l1_idx],
+    max_iter=10000,
+    precompute=True
 )
-enet.fit(X_train_scaled, y_train)
+enet.fit(X_train_scaled, y_train_arr)
 
 enet_train_pred = enet.predict(X_train_scaled)
 enet_test_pred = enet.predict(X_test_scaled) if len(X_test) > 0 else np.array([])
 enet_full_pred = enet.predict(X_full_scaled)
 
-enet_train_resid = y_train.values - enet_train_pred
+enet_train_resid = y_train_arr - enet_train_pred
 enet_sigma = enet_train_resid.std()
-enet_test_resid = y_test.values - enet_test_pred if len(X_test) > 0 else np.array([])
+enet_test_resid = y_test_arr - enet_test_pred if len(X_test) > 0 else np.array([])
 
 n_features_enet = np.sum(np.abs(enet.coef_) > 1e-5)
 
@@ -280,20 +366,17 @@ enet_results = {
     'train_resid': enet_train_resid,
     'test_resid': enet_test_resid,
     'metrics': {
-        'best_alpha': enet.alpha_,
-        'best_l1_ratio': enet.l1_ratio_,
+        'best_alpha': enet.alpha,
+        'best_l1_ratio': enet.l1_ratio,
         'n_features_selected': n_features_enet,
-        'r2_train': r2_score(y_train, enet_train_pred),
-        'r2_test': r2_score(y_test, enet_test_pred) if len(X_test) > 0 else np.nan,
-        'rmse_train': np.sqrt(mean_squared_error(y_train, enet_train_pred)),
-        'rmse_test': np.sqrt(mean_squared_error(y_test, enet_test_pred)) if len(X_test) > 0 else np.nan,
+        **compute_fit_metrics(enet_train_resid, enet_test_resid),
         'regime_stats_train': compute_regime_stats(enet_train_resid, enet_sigma),
         'regime_stats_test': compute_regime_stats(enet_test_resid, enet_sigma) if len(X_test) > 0 else {},
-        'stability': compute_stability_metrics(pd.Series(enet_full_pred, index=y_full.index))
+        'stability': compute_stability_metrics(enet_full_pred)
     }
 }
 
-print(f"  Best alpha: {enet.alpha_:.5f}, L1 ratio: {enet.l1_ratio_:.2f}")
+print(f"  Best alpha: {enet.alpha:.5f}, L1 ratio: {enet.l1_ratio:.2f}")
 print(f"  Features selected: {n_features_enet}/{len(X_train.columns)}")
 print(f"  R² train: {enet_results['metrics']['r2_train']:.3f}")
 print(f"  R² test:  {enet_results['metrics']['r2_test']:.3f}" if len(X_test) > 0 else "")
@@ -312,29 +395,14 @@ print("\n" + "="*80)
 print("[MODEL 4/5] XGBOOST (Single-Stage, Regularized)")
 print("="*80)
 
-# Use moderate regularization to prevent overfitting
-xgb_single = XGBRegressor(
-    n_estimators=300,
-    learning_rate=0.05,
-    max_depth=3,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    reg_lambda=10.0,  # Stronger L2
-    reg_alpha=5.0,    # Add L1
-    objective="reg:squarederror",
-    tree_method="hist",
-    random_state=42
-)
-
-xgb_single.fit(X_train, y_train, verbose=False)
-
-xgb_single_train_pred = xgb_single.predict(X_train)
-xgb_single_test_pred = xgb_single.predict(X_test) if len(X_test) > 0 else np.array([])
-xgb_single_full_pred = xgb_single.predict(X_full)
+# Fitted in the background alongside the Lasso / ElasticNet grid above
+xgb_single_train_pred = xgb_single.predict(X_train_xgb)
+xgb_single_test_pred = xgb_single.predict(X_test_xgb) if len(X_test) > 0 else np.array([])
+xgb_single_full_pred = xgb_single.predict(X_full_xgb)
 
-xgb_single_train_resid = y_train.values - xgb_single_train_pred
+xgb_single_train_resid = y_train_arr - xgb_single_train_pred
 xgb_single_sigma = xgb_single_train_resid.std()
-xgb_single_test_resid = y_test.values - xgb_single_test_pred if len(X_test) > 0 else np.array([])
+xgb_single_test_resid = y_test_arr - xgb_single_test_pred if len(X_test) > 0 else np.array([])
 
 xgb_single_results = {
     'name': 'XGBoost Single-Stage',
@@ -346,13 +414,10 @@ xgb_single_results = {
     'train_resid': xgb_single_train_resid,
     'test_resid': xgb_single_test_resid,
     'metrics': {
-        'r2_train': r2_score(y_train, xgb_single_train_pred),
-        'r2_test': r2_score(y_test, xgb_single_test_pred) if len(X_test) > 0 else np.nan,
-        'rmse_train': np.sqrt(mean_squared_error(y_train, xgb_single_train_pred)),
-        'rmse_test': np.sqrt(mean_squared_error(y_test, xgb_single_test_pred)) if len(X_test) > 0 else np.nan,
+        **compute_fit_metrics(xgb_single_train_resid, xgb_single_test_resid),
         'regime_stats_train': compute_regime_stats(xgb_single_train_resid, xgb_single_sigma),
         'regime_stats_test': compute_regime_stats(xgb_single_test_resid, xgb_single_sigma) if len(X_test) > 0 else {},
-        'stability': compute_stability_metrics(pd.Series(xgb_single_full_pred, index=y_full.index))
+        'stability': compute_stability_metrics(xgb_single_full_pred)
     }
 }
 
@@ -365,7 +430,7 @@ print(f"    In-line (<1σ):  {xgb_single_results['metrics']['regime_stats_train'
 print(f"    Stretch (1-2σ): {xgb_single_results['metrics']['regime_stats_train']['stretch_pct']:.1%}")
 print(f"    Break (>2σ):    {xgb_single_results['metrics']['regime_stats_train']['break_pct']:.1%}")
 
-top_features = get_top_features(xgb_single, X_train.columns, 10)
+top_features = get_top_features(xgb_single, feature_names, 10)
 print(f"\n  Top 10 features by importance:")
 for feat, imp in top_features:
     print(f"    {feat:40s} {imp:.4f}")
@@ -384,41 +449,28 @@ m1_train_pred = ridge_train_pred
 m1_test_pred = ridge_test_pred
 m1_full_pred = ridge_full_pred
 
-# Compute M1 residuals
-m1_train_resid = y_train.values - m1_train_pred
-m1_sigma = m1_train_resid.std()
-m1_test_resid = y_test.values - m1_test_pred if len(X_test) > 0 else np.array([])
+# M1 residuals are the Ridge residuals already computed above
+m1_train_resid = ridge_train_resid
+m1_sigma = ridge_sigma
+m1_test_resid = ridge_test_resid
 
 print(f"  M1 (Ridge) σ: {m1_sigma:.5f}")
 
 # Augment features with regime indicators
 print("\n  Stage 2: Training residual model (M2) with regime awareness")
 m1_z_train = m1_train_resid / m1_sigma
-m1_z_test = m1_test_resid / m1_sigma if len(X_test) > 0 else np.array([])
-
-# Create augmented features
-X_train_aug = X_train.copy()
-X_train_aug['m1_residual_z'] = m1_z_train
-X_train_aug['regime_break'] = (np.abs(m1_z_train) > 2.0).astype(int)
-X_train_aug['regime_stretch'] = ((np.abs(m1_z_train) > 1.0) & (np.abs(m1_z_train) <= 2.0)).astype(int)
-
-if len(X_test) > 0:
-    X_test_aug = X_test.copy()
-    X_test_aug['m1_residual_z'] = m1_z_test
-    X_test_aug['regime_break'] = (np.abs(m1_z_test) > 2.0).astype(int)
-    X_test_aug['regime_stretch'] = ((np.abs(m1_z_test) > 1.0) & (np.abs(m1_z_test) <= 2.0)).astype(int)
-
-# Full dataset augmentation for final predictions
-m1_full_resid = y_full.values - m1_full_pred
+
+# Create augmented features (one fused float32 matrix per split)
+X_train_aug = augment_with_m1(X_train_xgb, m1_z_train)
+
+# Full dataset augmentation for final predictions (train / test rows are
+# sliced out of it below rather than augmented and predicted separately)
+m1_full_resid = y_full_arr - m1_full_pred
 m1_z_full = m1_full_resid / m1_sigma
-X_full_aug = X_full.copy()
-X_full_aug['m1_residual_z'] = m1_z_full
-X_full_aug['regime_break'] = (np.abs(m1_z_full) > 2.0).astype(int)
-X_full_aug['regime_stretch'] = ((np.abs(m1_z_full) > 1.0) & (np.abs(m1_z_full) <= 2.0)).astype(int)
+X_full_aug = augment_with_m1(X_full_xgb, m1_z_full)
 
 # Train M2 on residuals
-xgb_m2 = XGBRegressor(
-    n_estimators=200,
+m2_params = dict(
     learning_rate=0.05,
     max_depth=2,  # Shallow for residual correction
     subsample=0.7,
@@ -427,23 +479,43 @@ xgb_m2 = XGBRegressor(
     reg_alpha=10.0,
     objective="reg:squarederror",
     tree_method="hist",
+    max_bin=64,       # Coarse histograms are plenty for a depth-2 correction
+    n_jobs=-1,
     random_state=42
 )
 
+# Pick the tree count on the last M2_VAL_MONTHS of the training window
+# (the test period stays untouched by model selection)...
+M2_VAL_MONTHS = 24
+m2_fit_end = len(X_train_aug) - M2_VAL_MONTHS
+m2_probe = XGBRegressor(n_estimators=200, early_stopping_rounds=20, **m2_params)
+m2_probe.fit(
+    X_train_aug[:m2_fit_end], m1_train_resid[:m2_fit_end],
+    eval_set=[(X_train_aug[m2_fit_end:], m1_train_resid[m2_fit_end:])],
+    verbose=False
+)
+m2_n_trees = m2_probe.best_iteration + 1
+print(f"  M2 trees kept: {m2_n_trees} / {m2_probe.n_estimators}")
+
+# ...then refit that many trees on the whole training window so the
+# production M2 still sees the most recent months
+xgb_m2 = XGBRegressor(n_estimators=m2_n_trees, **m2_params)
 xgb_m2.fit(X_train_aug, m1_train_resid, verbose=False)
 
-m2_train_pred = xgb_m2.predict(X_train_aug)
-m2_test_pred = xgb_m2.predict(X_test_aug) if len(X_test) > 0 else np.array([])
+# One predict pass over every month; tree outputs are per row, so the
+# train / test predictions are just the matching rows of the full pass
 m2_full_pred = xgb_m2.predict(X_full_aug)
+m2_train_pred = m2_full_pred[train_mask]
+m2_test_pred = m2_full_pred[~train_mask] if len(X_test) > 0 else np.array([])
 
 # Final predictions = M1 + M2
 twostage_train_pred = m1_train_pred + m2_train_pred
 twostage_test_pred = m1_test_pred + m2_test_pred if len(X_test) > 0 else np.array([])
 twostage_full_pred = m1_full_pred + m2_full_pred
 
-twostage_train_resid = y_train.values - twostage_train_pred
+twostage_train_resid = y_train_arr - twostage_train_pred
 twostage_sigma = twostage_train_resid.std()
-twostage_test_resid = y_test.values - twostage_test_pred if len(X_test) > 0 else np.array([])
+twostage_test_resid = y_test_arr - twostage_test_pred if len(X_test) > 0 else np.array([])
 
 twostage_results = {
     'name': 'Two-Stage (Ridge + XGB Residual)',
@@ -456,13 +528,10 @@ twostage_results = {
     'train_resid': twostage_train_resid,
     'test_resid': twostage_test_resid,
     'metrics': {
-        'r2_train': r2_score(y_train, twostage_train_pred),
-        'r2_test': r2_score(y_test, twostage_test_pred) if len(X_test) > 0 else np.nan,
-        'rmse_train': np.sqrt(mean_squared_error(y_train, twostage_train_pred)),
-        'rmse_test': np.sqrt(mean_squared_error(y_test, twostage_test_pred)) if len(X_test) > 0 else np.nan,
+        **compute_fit_metrics(twostage_train_resid, twostage_test_resid),
         'regime_stats_train': compute_regime_stats(twostage_train_resid, twostage_sigma),
         'regime_stats_test': compute_regime_stats(twostage_test_resid, twostage_sigma) if len(X_test) > 0 else {},
-        'stability': compute_stability_metrics(pd.Series(twostage_full_pred, index=y_full.index))
+        'stability': compute_stability_metrics(twostage_full_pred)
     }
 }
 
@@ -483,6 +552,8 @@ print("\n" + "="*80)
 print("SAVING RESULTS")
 print("="*80)
 
+ARRAY_FIELDS = ('train_pred', 'test_pred', 'full_pred', 'train_resid', 'test_resid')
+
 all_models = {
     'ridge': ridge_results,
     'lasso': lasso_results,
@@ -495,9 +566,28 @@ all_models = {
 output_dir = Path('fx_layer1_outputs')
 output_dir.mkdir(exist_ok=True)
 
+# Fitted estimators + scalar metrics go to joblib; the prediction / residual
+# arrays go to one compressed npz keyed '{model}_{field}'
+estimators = {
+    key: {k: v for k, v in results.items() if k not in ARRAY_FIELDS}
+    for key, results in all_models.items()
+}
+arrays = {
+    f'{key}_{field}': results[field]
+    for key, results in all_models.items()
+    for field in ARRAY_FIELDS
+}
+joblib.dump(estimators, output_dir / 'estimators.joblib', compress=3)
+np.savez_compressed(output_dir / 'arrays.npz', **arrays)
+print(f"✓ Saved models: {output_dir / 'estimators.joblib'}")
+print(f"✓ Saved arrays: {output_dir / 'arrays.npz'}")
+
+# Legacy single-file pickle, still opened by fx_views_charts.py,
+# fx_views_decision_table.py and fx_layer2_lightgbm_only.py - keep writing it
+# (so it never goes stale next to the new files) until they are migrated
 with open(output_dir / 'all_models.pkl', 'wb') as f:
-    pickle.dump(all_models, f)
-print(f"✓ Saved models: {output_dir / 'all_models.pkl'}")
+    pickle.dump(all_models, f, protocol=pickle.HIGHEST_PROTOCOL)
+print(f"✓ Saved legacy models: {output_dir / 'all_models.pkl'}")
 
 # Create evaluation JSON
 eval_summary = {}
@@ -519,40 +609,52 @@ for key, results in all_models.items():
         }
     }
 
-with open(output_dir / 'evaluation_summary.json', 'w') as f:
-    json.dump(eval_summary, f, indent=2)
+write_json(output_dir / 'evaluation_summary.json', eval_summary)
 print(f"✓ Saved evaluation: {output_dir / 'evaluation_summary.json'}")
 
-# Save predictions CSV for each model
-for key, results in all_models.items():
+REGIME_EDGES = [1.0, 2.0]
+REGIME_LABELS = ['In-line', 'Stretch', 'Break']
+
+# Text copies for the layer 2 / views scripts that still read the CSVs
+WRITE_PREDICTION_CSV = True
+
+full_dates = y_full.index.to_numpy()
+
+def save_predictions(key, results):
+    """Write one model's prediction frame as typed Parquet (+ optional CSV copy)"""
+    fair_value = results['full_pred']
+    sigma = results['sigma']
+    mispricing = y_full_arr - fair_value
+    mispricing_z = mispricing / sigma
+    
+    # Every column built as an array first, then one DataFrame construction
     pred_df = pd.DataFrame({
-        'date': y_full.index,
-        'spot': y_full.values,
-        'fair_value': results['full_pred'],
-        'mispricing': y_full.values - results['full_pred'],
-        'mispricing_z': (y_full.values - results['full_pred']) / results['sigma']
+        'date': full_dates,
+        'spot': y_full_arr,
+        'fair_value': fair_value,
+        'mispricing': mispricing,
+        'mispricing_z': mispricing_z,
+        # Regime labels: |z| < 1 In-line, < 2 Stretch, else Break (NaN too)
+        'regime': pd.Categorical.from_codes(
+            np.searchsorted(REGIME_EDGES, np.abs(mispricing_z), side='right'), REGIME_LABELS),
+        # Bands
+        'fv_plus_1sigma': fair_value + sigma,
+        'fv_minus_1sigma': fair_value - sigma,
+        'fv_plus_2sigma': fair_value + 2 * sigma,
+        'fv_minus_2sigma': fair_value - 2 * sigma
     })
     
-    # Add regime labels
-    def get_regime(z):
-        abs_z = abs(z)
-        if abs_z < 1.0:
-            return "In-line"
-        elif abs_z < 2.0:
-            return "Stretch"
-        else:
-            return "Break"
-    
-    pred_df['regime'] = pred_df['mispricing_z'].apply(get_regime)
-    
-    # Add bands
-    pred_df['fv_plus_1sigma'] = pred_df['fair_value'] + results['sigma']
-    pred_df['fv_minus_1sigma'] = pred_df['fair_value'] - results['sigma']
-    pred_df['fv_plus_2sigma'] = pred_df['fair_value'] + 2 * results['sigma']
-    pred_df['fv_minus_2sigma'] = pred_df['fair_value'] - 2 * results['sigma']
-    
-    pred_df.to_csv(output_dir / f'{key}_predictions.csv', index=False)
-    print(f"✓ Saved predictions: {output_dir / f'{key}_predictions.csv'}")
+    pred_df.to_parquet(output_dir / f'{key}_predictions.parquet', engine='pyarrow', compression='zstd', index=False)
+    if WRITE_PREDICTION_CSV:
+        pred_df.to_csv(output_dir / f'{key}_predictions.csv', index=False)
+    return output_dir / f'{key}_predictions.parquet'
+
+# The five models are independent; pyarrow encoding / compression and the
+# file writes release the GIL, so a thread per model overlaps them
+with ThreadPoolExecutor(max_workers=len(all_models)) as pool:
+    saved_paths = list(pool.map(save_predictions, all_models.keys(), all_models.values()))
+for path in saved_paths:
+    print(f"✓ Saved predictions: {path}" + (" (+ .csv)" if WRITE_PREDICTION_CSV else ""))
 
 print("\n" + "="*80)
 print("✅ LAYER 1 TRAINING COMPLETE")
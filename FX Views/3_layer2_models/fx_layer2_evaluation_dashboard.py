@@ -30,6 +30,13 @@ test_z = all_results['test_z']
 
 print("\n✓ Loaded results for 8 models (4 per target)")
 
+MODEL_ORDER = ['ridge', 'elasticnet', 'xgboost', 'lightgbm']
+SCORE_WEIGHTS = np.array([0.6, 0.4])
+
+def composite_scores(metrics):
+    """60/40 blend of the (test, |z|>1σ) columns; test alone where |z|>1σ is NaN"""
+    return np.where(np.isnan(metrics[:, 1]), metrics[:, 0], metrics @ SCORE_WEIGHTS)
+
 # ============================================================================
 # TARGET A: Δz - COMPARISON TABLE
 # ============================================================================
@@ -47,17 +54,17 @@ print(f"\n{'Model':<20} {'Hit Rate Test':>15} {'Hit Rate (|z|>1σ)':>20} {'RMSE
 print("-" * 90)
 
 # Get available models only
-available_models = [k for k in ['ridge', 'elasticnet', 'xgboost', 'lightgbm'] if k in results_delta_z]
-
-for key in available_models:
-    model_name = results_delta_z[key]['name']
-    hit_test = results_delta_z[key]['hit_rate_test']
-    hit_high_z = results_delta_z[key]['hit_rate_high_z']
-    rmse = results_delta_z[key]['rmse_test']
-    
-    # Calculate score for comparison
-    score = (0.6 * hit_test + 0.4 * hit_high_z) if not np.isnan(hit_high_z) else hit_test
-    
+available_models = [k for k in MODEL_ORDER if k in results_delta_z]
+
+# Columns: hit rate (test), hit rate (|z|>1σ), RMSE (test); None -> NaN
+delta_z_metrics = np.array([
+    [results_delta_z[k]['hit_rate_test'], results_delta_z[k]['hit_rate_high_z'], results_delta_z[k]['rmse_test']]
+    for k in available_models
+], dtype=np.float64)
+delta_z_scores = composite_scores(delta_z_metrics[:, :2])
+model_names = [results_delta_z[k]['name'] for k in available_models]
+
+for model_name, (hit_test, hit_high_z, rmse), score in zip(model_names, delta_z_metrics, delta_z_scores):
     print(f"{model_name:<20} {hit_test:>14.1%} {hit_high_z:>19.1%} {rmse:>15.5f} {score:>9.1%}")
 
 print("-" * 90)
@@ -67,16 +74,8 @@ if 'lightgbm' not in results_delta_z:
 print("="*90)
 
 # Find best model for Δz (only from available models)
-delta_z_scores = {}
-for key in available_models:
-    hit_test = results_delta_z[key]['hit_rate_test']
-    hit_high_z = results_delta_z[key]['hit_rate_high_z']
-    
-    # Score: 60% weight on hit_test, 40% on hit_high_z
-    score = (0.6 * hit_test + 0.4 * hit_high_z) if not np.isnan(hit_high_z) else hit_test
-    delta_z_scores[key] = score
-
-best_delta_z = max(delta_z_scores.keys(), key=lambda k: delta_z_scores[k])
+best_delta_z_idx = delta_z_scores.argmax()
+best_delta_z = available_models[best_delta_z_idx]
 
 print(f"\n🏆 BEST MODEL (Δz): {results_delta_z[best_delta_z]['name']}")
 print(f"   Hit Rate (test): {results_delta_z[best_delta_z]['hit_rate_test']:.1%}")
@@ -98,16 +97,17 @@ print(f"\n{'Model':<20} {'Accuracy Test':>15} {'Accuracy (|z|>1σ)':>20} {'Score
 print("-" * 90)
 
 # Get available models only
-available_binary_models = [k for k in ['ridge', 'elasticnet', 'xgboost', 'lightgbm'] if k in results_binary]
-
-for key in available_binary_models:
-    model_name = results_binary[key]['name']
-    acc_test = results_binary[key]['accuracy_test']
-    acc_high_z = results_binary[key]['accuracy_high_z']
-    
-    # Calculate score for comparison
-    score = (0.6 * acc_test + 0.4 * acc_high_z) if not np.isnan(acc_high_z) else acc_test
-    
+available_binary_models = [k for k in MODEL_ORDER if k in results_binary]
+
+# Columns: accuracy (test), accuracy (|z|>1σ); None -> NaN
+binary_metrics = np.array([
+    [results_binary[k]['accuracy_test'], results_binary[k]['accuracy_high_z']]
+    for k in available_binary_models
+], dtype=np.float64)
+binary_scores = composite_scores(binary_metrics)
+model_names_binary = [results_binary[k]['name'] for k in available_binary_models]
+
+for model_name, (acc_test, acc_high_z), score in zip(model_names_binary, binary_metrics, binary_scores):
     print(f"{model_name:<20} {acc_test:>14.1%} {acc_high_z:>19.1%} {score:>9.1%}")
 
 print("-" * 90)
@@ -117,16 +117,8 @@ if 'lightgbm' not in results_binary:
 print("="*90)
 
 # Find best model for Binary (only from available models)
-binary_scores = {}
-for key in available_binary_models:
-    acc_test = results_binary[key]['accuracy_test']
-    acc_high_z = results_binary[key]['accuracy_high_z']
-    
-    # Score: 60% weight on acc_test, 40% on acc_high_z
-    score = (0.6 * acc_test + 0.4 * acc_high_z) if not np.isnan(acc_high_z) else acc_test
-    binary_scores[key] = score
-
-best_binary = max(binary_scores.keys(), key=lambda k: binary_scores[k])
+best_binary_idx = binary_scores.argmax()
+best_binary = available_binary_models[best_binary_idx]
 
 print(f"\n🏆 BEST MODEL (Binary): {results_binary[best_binary]['name']}")
 print(f"   Accuracy (test): {results_binary[best_binary]['accuracy_test']:.1%}")
@@ -145,9 +137,7 @@ fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
 fig.suptitle('Layer 2 (Δz Target) - Model Comparison', 
              fontsize=14, fontweight='bold', color='white')
 
-model_names = [results_delta_z[k]['name'] for k in available_models]
-hit_rates_test = [results_delta_z[k]['hit_rate_test'] * 100 for k in available_models]
-hit_rates_high_z = [results_delta_z[k]['hit_rate_high_z'] * 100 for k in available_models]
+hit_rates_test, hit_rates_high_z = (delta_z_metrics[:, :2] * 100).T
 
 x = np.arange(len(model_names))
 width = 0.35
@@ -168,7 +158,7 @@ for spine in ax1.spines.values():
     spine.set_color('white')
 
 # RMSE comparison
-rmse_vals = [results_delta_z[k]['rmse_test'] for k in available_models]
+rmse_vals = delta_z_metrics[:, 2]
 ax2.barh(model_names, rmse_vals, color='green', alpha=0.7)
 ax2.set_xlabel('RMSE', fontsize=11, color='white')
 ax2.set_title('Prediction Error (Lower is Better)', fontsize=12, fontweight='bold', color='white')
@@ -180,22 +170,20 @@ for spine in ax2.spines.values():
 
 fig.patch.set_facecolor('#0a0a0a')
 plt.tight_layout()
-plt.savefig(results_dir / 'layer2_comparison_delta_z.png', dpi=300, facecolor='#0a0a0a')
-plt.close()
+plt.savefig(results_dir / 'layer2_comparison_delta_z.png', dpi=150, facecolor='#0a0a0a')
 print(f"✓ Saved: {results_dir / 'layer2_comparison_delta_z.png'}")
 
-# Chart 2: Accuracy Comparison (Binary models)
-fig, ax = plt.subplots(figsize=(10, 6))
+# Chart 2: Accuracy Comparison (Binary models) - redrawn on the same figure
+# and Agg canvas rather than building a new one
+fig.clear()
+fig.set_size_inches(10, 6)
+ax = fig.add_subplot()
 fig.suptitle('Layer 2 (Binary Target) - Model Comparison',
              fontsize=14, fontweight='bold', color='white')
 
-acc_test = [results_binary[k]['accuracy_test'] * 100 for k in available_binary_models]
-acc_high_z = [results_binary[k]['accuracy_high_z'] * 100 for k in available_binary_models]
+acc_test, acc_high_z = (binary_metrics * 100).T
 
-# Use the same model names for consistency
-model_names_binary = [results_binary[k]['name'] for k in available_binary_models]
-
-x = np.arange(len(model_names))
+x = np.arange(len(model_names_binary))
 width = 0.35
 
 bars1 = ax.bar(x - width/2, acc_test, width, label='Test (All)', color='cyan', alpha=0.8)
@@ -215,8 +203,8 @@ for spine in ax.spines.values():
 
 fig.patch.set_facecolor('#0a0a0a')
 plt.tight_layout()
-plt.savefig(results_dir / 'layer2_comparison_binary.png', dpi=300, facecolor='#0a0a0a')
-plt.close()
+plt.savefig(results_dir / 'layer2_comparison_binary.png', dpi=150, facecolor='#0a0a0a')
+plt.close(fig)
 print(f"✓ Saved: {results_dir / 'layer2_comparison_binary.png'}")
 
 # ============================================================================
@@ -241,7 +229,7 @@ print(f"    • Pro: Simple expanding/compressing signal")
 print(f"    • Con: Loses magnitude information")
 
 # Auto-select based on performance
-if delta_z_scores[best_delta_z] > binary_scores[best_binary]:
+if delta_z_scores[best_delta_z_idx] > binary_scores[best_binary_idx]:
     recommended_target = 'delta_z'
     recommended_model = best_delta_z
     recommended_score = results_delta_z[best_delta_z]['hit_rate_test']
@@ -7,6 +7,7 @@ import pandas as pd
 import numpy as np
 import pickle
 import json
+import sys
 from pathlib import Path
 
 print("="*80)
@@ -21,6 +22,35 @@ except ModuleNotFoundError:
     print("[ERROR] LightGBM not installed")
     exit(1)
 
+# Load existing models to merge with
+models_path = Path('fx_layer2_outputs/all_models.pkl')
+with open(models_path, 'rb') as f:
+    existing = pickle.load(f)
+
+# Nothing to retrain when the saved LightGBM entries are newer than every
+# input (pass --force to refit anyway). Layer 1 writes all of its outputs on
+# each run, so any of them being newer means a retrain happened
+input_paths = [
+    Path('fx_layer1_outputs/layer1_recommendation.json'),
+    Path('fx_layer1_outputs/estimators.joblib'),
+    Path('fx_layer1_outputs/arrays.npz'),
+    Path('fx_layer1_outputs/all_models.pkl'),
+    Path('fx_layer2_weekly_features.parquet'),
+]
+
+def inputs_older_than(path):
+    """True when every input exists and was written before path (missing = stale)"""
+    if not all(p.exists() for p in input_paths):
+        return False
+    return max(p.stat().st_mtime for p in input_paths) < path.stat().st_mtime
+
+if ('--force' not in sys.argv[1:]
+        and 'lightgbm' in existing.get('delta_z', {})
+        and 'lightgbm' in existing.get('binary', {})
+        and inputs_older_than(models_path)):
+    print(f"[OK] LightGBM models in {models_path} are up to date - skipping retrain (--force to refit)")
+    sys.exit(0)
+
 # Load weekly features and prepare data
 print("\n[1] Preparing training data...")
 
@@ -34,22 +64,29 @@ model_key = layer1_rec['model_key']
 layer1_data = pd.read_pickle('fx_layer1_outputs/all_models.pkl')
 monthly_full = layer1_data[model_key]['monthly_full']
 
-# Load weekly features
-weekly_features = pd.read_pickle('fx_layer2_outputs/weekly_features.pkl')
+# Load weekly features: columnar Parquet written by fx_layer2_weekly_features.py
+# (date index, brought back out as the 'date' column the merge keys on)
+weekly_features = pd.read_parquet('fx_layer2_weekly_features.parquet', engine='pyarrow')
+weekly_features = weekly_features.rename_axis('date').reset_index()
 
-# Merge with monthly FV
+# Merge with monthly FV; weekly features are already NaN-free, so only the
+# monthly columns need carrying forward between month ends
+MONTHLY_COLS = ['spot', 'fair_value', 'mispricing', 'z_score']
 weekly_with_fv = weekly_features.merge(
-    monthly_full[['date', 'spot', 'fair_value', 'mispricing', 'z_score']],
+    monthly_full[['date'] + MONTHLY_COLS],
     on='date',
     how='left'
-).ffill()
+)
+weekly_with_fv[MONTHLY_COLS] = weekly_with_fv[MONTHLY_COLS].ffill()
 
-# Create targets
-weekly_with_fv['delta_z'] = weekly_with_fv['z_score'].diff()
-weekly_with_fv['expanding'] = (weekly_with_fv['delta_z'] > 0).astype(int)
+# Create targets on the raw array (first delta is NaN)
+delta_z = np.diff(weekly_with_fv['z_score'].to_numpy(dtype=np.float64), prepend=np.nan)
+weekly_with_fv['delta_z'] = delta_z
+weekly_with_fv['expanding'] = (delta_z > 0).view(np.int8)
 
-# Drop first row (NaN delta)
-weekly_with_fv = weekly_with_fv.iloc[1:].reset_index(drop=True)
+# Drop first row (NaN delta); the masks below are built on this frame, so
+# the original index can stay
+weekly_with_fv = weekly_with_fv.iloc[1:]
 
 # Train/test split (2025 = test)
 split_date = '2025-01-01'
@@ -60,26 +97,32 @@ test_mask = weekly_with_fv['date'] >= split_date
 feature_cols = [c for c in weekly_with_fv.columns 
                 if c not in ['date', 'spot', 'fair_value', 'mispricing', 'z_score', 'delta_z', 'expanding']]
 
-X_train = weekly_with_fv.loc[train_mask, feature_cols].values
-X_test = weekly_with_fv.loc[test_mask, feature_cols].values
+# One float32 feature matrix (LightGBM bins it as-is and it scales in place).
+# Weeks are date-sorted, so the train rows come first and both splits are
+# row views of it; prediction runs once over the whole block
+n_train = int(train_mask.sum())
+X_all = weekly_with_fv.loc[train_mask | test_mask, feature_cols].to_numpy(dtype=np.float32)
+X_train = X_all[:n_train]
+X_test = X_all[n_train:]
 y_train_delta_z = weekly_with_fv.loc[train_mask, 'delta_z'].values
 y_test_delta_z = weekly_with_fv.loc[test_mask, 'delta_z'].values
 y_train_binary = weekly_with_fv.loc[train_mask, 'expanding'].values
 y_test_binary = weekly_with_fv.loc[test_mask, 'expanding'].values
 test_z = weekly_with_fv.loc[test_mask, 'z_score'].values
 
+# |z| > 1σ mask shared by both targets
+high_z_mask = np.abs(test_z) > 1.0
+has_high_z = high_z_mask.any()
+
 print(f"  [OK] Training data: {len(X_train)} samples, {X_train.shape[1]} features")
 print(f"  [OK] Test data: {len(X_test)} samples")
 
 # Scale data
 from sklearn.preprocessing import StandardScaler
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# Load existing models to merge with
-with open('fx_layer2_outputs/all_models.pkl', 'rb') as f:
-    existing = pickle.load(f)
+scaler = StandardScaler(copy=False)
+scaler.fit(X_train)
+X_all_scaled = scaler.transform(X_all)
+X_train_scaled = X_all_scaled[:n_train]
 
 print("\n" + "="*80)
 print("TARGET A: Δz (Change in Mispricing Z-Score)")
@@ -101,9 +144,10 @@ lgbm_delta_z = LGBMRegressor(
 
 lgbm_delta_z.fit(X_train_scaled, y_train_delta_z)
 
-# Predictions
-pred_train_delta_z = lgbm_delta_z.predict(X_train_scaled)
-pred_test_delta_z = lgbm_delta_z.predict(X_test_scaled)
+# Predictions: one booster pass over train + test rows
+pred_all_delta_z = lgbm_delta_z.booster_.predict(X_all_scaled)
+pred_train_delta_z = pred_all_delta_z[:n_train]
+pred_test_delta_z = pred_all_delta_z[n_train:]
 
 # Calculate hit rates
 def hit_rate(y_true, y_pred):
@@ -123,8 +167,7 @@ print(f"  RMSE train: {rmse_train:.4f}")
 print(f"  RMSE test:  {rmse_test:.4f}")
 
 # Hit rate when |z| > 1σ
-high_z_mask = np.abs(test_z) > 1.0
-if high_z_mask.sum() > 0:
+if has_high_z:
     hr_high_z = hit_rate(y_test_delta_z[high_z_mask], pred_test_delta_z[high_z_mask])
     print(f"  Hit rate (|z|>1σ): {hr_high_z:.1%}")
 else:
@@ -151,9 +194,10 @@ lgbm_binary = LGBMClassifier(
 
 lgbm_binary.fit(X_train_scaled, y_train_binary)
 
-# Predictions
-pred_train_binary = lgbm_binary.predict(X_train_scaled)
-pred_test_binary = lgbm_binary.predict(X_test_scaled)
+# Predictions: one booster pass, P(expanding) > 0.5 -> class (as predict())
+pred_all_binary = lgbm_binary.classes_[(lgbm_binary.booster_.predict(X_all_scaled) > 0.5).view(np.int8)]
+pred_train_binary = pred_all_binary[:n_train]
+pred_test_binary = pred_all_binary[n_train:]
 
 # Accuracy
 acc_train = np.mean(y_train_binary == pred_train_binary)
@@ -163,7 +207,7 @@ print(f"  Accuracy train: {acc_train:.1%}")
 print(f"  Accuracy test:  {acc_test:.1%}")
 
 # Accuracy when |z| > 1σ
-if high_z_mask.sum() > 0:
+if has_high_z:
     acc_high_z = np.mean(y_test_binary[high_z_mask] == pred_test_binary[high_z_mask])
     print(f"  Accuracy (|z|>1σ): {acc_high_z:.1%}")
 else:
@@ -205,7 +249,7 @@ existing['binary']['lightgbm'] = {
 }
 
 # Save updated models
-with open('fx_layer2_outputs/all_models.pkl', 'wb') as f:
+with open(models_path, 'wb') as f:
     pickle.dump(existing, f)
 
 print("[OK] Saved to fx_layer2_outputs/all_models.pkl")
@@ -18,17 +18,23 @@ EVALUATION:
 """
 import pandas as pd
 import numpy as np
+import os
 import pickle
+import sys
+from functools import lru_cache
 from pathlib import Path
 from sklearn.linear_model import RidgeCV, ElasticNetCV
 from sklearn.preprocessing import StandardScaler
+from threadpoolctl import threadpool_limits
 from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, precision_score, recall_score
+import xgboost as xgb
 from xgboost import XGBRegressor, XGBClassifier
 import json
 
 # Try to import LightGBM (optional)
 try:
     from lightgbm import LGBMRegressor, LGBMClassifier
+    from lightgbm.basic import LightGBMError
     LIGHTGBM_AVAILABLE = True
 except ImportError:
     LIGHTGBM_AVAILABLE = False
@@ -54,9 +60,23 @@ with open(layer1_dir / 'layer1_recommendation.json', 'r') as f:
 best_model_key = layer1_rec['selected_model']
 print(f"  ✓ Layer 1 model: {layer1_rec['model_name']}")
 
+PREDICTION_COLUMNS = ['date', 'fair_value', 'mispricing_z']
+
+def load_predictions(key):
+    """Layer 1 monthly predictions (date-indexed), from Parquet when present"""
+    parquet_path = layer1_dir / f'{key}_predictions.parquet'
+    if parquet_path.exists():
+        pred = pd.read_parquet(parquet_path, engine='pyarrow', columns=PREDICTION_COLUMNS)
+    else:
+        # Older layer 1 runs only wrote the CSV: parse it once and leave the
+        # full Parquet sibling behind for the next run (and the dashboard)
+        pred = pd.read_csv(layer1_dir / f'{key}_predictions.csv', parse_dates=['date'])
+        pred.to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+        pred = pred[PREDICTION_COLUMNS]
+    return pred.set_index('date')
+
 # Load Layer 1 predictions (monthly)
-layer1_pred = pd.read_csv(layer1_dir / f'{best_model_key}_predictions.csv', parse_dates=['date'])
-layer1_pred = layer1_pred.set_index('date')
+layer1_pred = load_predictions(best_model_key)
 print(f"  ✓ Loaded monthly fair value: {len(layer1_pred)} months")
 
 # ============================================================================
@@ -65,8 +85,8 @@ print(f"  ✓ Loaded monthly fair value: {len(layer1_pred)} months")
 
 print("\n[2] Loading weekly features...")
 
-with open('fx_layer2_weekly_features.pkl', 'rb') as f:
-    weekly_features = pickle.load(f)
+# Columnar Parquet written by fx_layer2_weekly_features.py (date index kept)
+weekly_features = pd.read_parquet('fx_layer2_weekly_features.parquet', engine='pyarrow')
 
 print(f"  ✓ Loaded weekly features: {len(weekly_features)} weeks, {len(weekly_features.columns)-1} features")
 
@@ -80,12 +100,8 @@ print("\n[3] Mapping monthly fair value to weekly frequency...")
 weekly_fv = pd.DataFrame(index=weekly_features.index)
 weekly_fv['spot'] = weekly_features['spot']
 
-# Forward-fill monthly FV to weekly
-layer1_monthly = layer1_pred[['fair_value', 'mispricing_z']].copy()
-layer1_monthly.index = pd.to_datetime(layer1_monthly.index)
-
-# Reindex to weekly and forward-fill
-weekly_fv['fair_value'] = layer1_monthly['fair_value'].reindex(
+# Forward-fill monthly FV to weekly (the loader already gives a datetime index)
+weekly_fv['fair_value'] = layer1_pred['fair_value'].reindex(
     weekly_fv.index, method='ffill'
 )
 weekly_fv['mispricing'] = weekly_fv['spot'] - weekly_fv['fair_value']
@@ -135,8 +151,9 @@ print(f"  ✓ Date range: {df_full.index.min().strftime('%Y-%m-%d')} to {df_full
 print("\n[6] Train/Test split...")
 
 TRAIN_END = '2024-12-31'
-train_df = df_full[df_full.index <= TRAIN_END]
-test_df = df_full[df_full.index > TRAIN_END]
+train_mask = df_full.index <= TRAIN_END
+train_df = df_full[train_mask]
+test_df = df_full[~train_mask]
 
 # Feature columns (exclude targets and mispricing columns)
 feature_cols = [c for c in df_full.columns if c not in [
@@ -144,18 +161,93 @@ feature_cols = [c for c in df_full.columns if c not in [
     'target_delta_z', 'target_binary'
 ]]
 
-X_train = train_df[feature_cols]
-X_test = test_df[feature_cols]
-
-y_train_delta_z = train_df['target_delta_z']
-y_test_delta_z = test_df['target_delta_z']
-
-y_train_binary = train_df['target_binary']
-y_test_binary = test_df['target_binary']
+# Each split materialised once as contiguous NumPy arrays: every fit,
+# predict and metric below reuses these (no per-call DataFrame conversion /
+# validation copies inside scikit-learn, XGBoost or LightGBM)
+X_train = np.ascontiguousarray(train_df[feature_cols].to_numpy(dtype=np.float64))
+X_test = np.ascontiguousarray(test_df[feature_cols].to_numpy(dtype=np.float64))
+
+y_train_delta_z = train_df['target_delta_z'].to_numpy(dtype=np.float64)
+y_test_delta_z = test_df['target_delta_z'].to_numpy(dtype=np.float64)
+
+y_train_binary = train_df['target_binary'].to_numpy()
+y_test_binary = test_df['target_binary'].to_numpy()
+
+# XGBoost and LightGBM bin on float32 whatever they are given: cast once
+# here for all four tree models (the linear models stay on float64)
+X_train_f32 = X_train.astype(np.float32)
+X_test_f32 = X_test.astype(np.float32)
+
+# Tree model device: 'auto' (use a GPU when one trains), 'cpu' or 'cuda';
+# set with --device=... or FX_TREE_DEVICE (cpu skips the GPU probe entirely)
+TREE_DEVICE = next((arg.split('=', 1)[1] for arg in sys.argv[1:] if arg.startswith('--device=')),
+                   os.environ.get('FX_TREE_DEVICE', 'auto'))
+if TREE_DEVICE not in ('auto', 'cpu', 'cuda'):
+    raise ValueError(f"Unknown tree device {TREE_DEVICE!r} (expected auto, cpu or cuda)")
+
+@lru_cache(maxsize=None)
+def xgb_device():
+    """'cuda' when XGBoost can train on a visible GPU, else 'cpu' (probed on first use)"""
+    if TREE_DEVICE != 'auto':
+        return TREE_DEVICE
+    if not xgb.build_info().get('USE_CUDA', False):
+        return 'cpu'
+    try:
+        # A CUDA build without a usable device only fails once it trains
+        probe = xgb.DMatrix(np.zeros((2, 1), dtype=np.float32), label=np.zeros(2))
+        xgb.train({'tree_method': 'hist', 'device': 'cuda'}, probe, num_boost_round=1)
+        return 'cuda'
+    except xgb.core.XGBoostError:
+        return 'cpu'
+
+@lru_cache(maxsize=None)
+def lgbm_device():
+    """LightGBM device_type: 'gpu' when XGBoost found a GPU and this build can use it, else 'cpu'"""
+    if xgb_device() == 'cpu':
+        return 'cpu'
+    if TREE_DEVICE == 'cuda':
+        return 'gpu'
+    try:
+        # CPU-only LightGBM builds reject device_type='gpu' at fit time
+        LGBMRegressor(n_estimators=1, device_type='gpu', verbose=-1).fit(
+            np.arange(8, dtype=np.float32).reshape(-1, 1), np.arange(8.0))
+        return 'gpu'
+    except LightGBMError:
+        return 'cpu'
+
+# Tree settings shared by the Δz and binary models (regressor and
+# classifier wrappers get the same values)
+XGB_PARAMS = dict(
+    n_estimators=200,
+    learning_rate=0.05,
+    max_depth=3,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    reg_lambda=5.0,
+    reg_alpha=2.0,
+    random_state=42,
+    tree_method='hist'
+)
+LGBM_PARAMS = dict(
+    n_estimators=200,
+    learning_rate=0.05,
+    max_depth=3,
+    subsample=0.8,
+    colsample_bytree=0.8,
+    reg_lambda=5.0,
+    reg_alpha=2.0,
+    random_state=42,
+    verbose=-1
+)
 
 # Mispricing z-scores for conditional evaluation
-z_train = train_df['mispricing_z']
-z_test = test_df['mispricing_z']
+z_train = train_df['mispricing_z'].to_numpy(dtype=np.float64)
+z_test = test_df['mispricing_z'].to_numpy(dtype=np.float64)
+
+# |z| > 1σ test weeks, shared by all eight model evaluations
+high_z_test = np.abs(z_test) > 1.0
+has_high_z_test = bool(high_z_test.any())
+y_test_binary_high_z = y_test_binary[high_z_test]
 
 print(f"  Train: {len(X_train)} weeks (to {TRAIN_END})")
 print(f"  Test:  {len(X_test)} weeks ({test_df.index.min().strftime('%Y-%m-%d')} onward)")
@@ -166,14 +258,14 @@ print(f"  Features: {len(feature_cols)}")
 # ============================================================================
 
 def directional_accuracy(y_true, y_pred):
-    """Hit rate: % of correct directional predictions"""
-    return np.mean(np.sign(y_true) == np.sign(y_pred))
+    """Hit rate: % of correct directional predictions (sign-bit test; an exact 0 counts as up)"""
+    return (np.signbit(y_true) == np.signbit(y_pred)).mean()
 
 def conditional_accuracy(y_true, y_pred, condition_mask):
-    """Accuracy conditional on some condition"""
-    if condition_mask.sum() == 0:
+    """Accuracy conditional on some condition (condition_mask: boolean ndarray)"""
+    if not condition_mask.any():
         return np.nan
-    return np.mean(np.sign(y_true[condition_mask]) == np.sign(y_pred[condition_mask]))
+    return directional_accuracy(np.compress(condition_mask, y_true), np.compress(condition_mask, y_pred))
 
 # ============================================================================
 # TARGET A: Δz (REGRESSION MODELS)
@@ -196,12 +288,11 @@ ridge_delta_z.fit(X_train, y_train_delta_z)
 ridge_train_pred = ridge_delta_z.predict(X_train)
 ridge_test_pred = ridge_delta_z.predict(X_test) if len(X_test) > 0 else np.array([])
 
-ridge_hit_train = directional_accuracy(y_train_delta_z.values, ridge_train_pred)
-ridge_hit_test = directional_accuracy(y_test_delta_z.values, ridge_test_pred) if len(X_test) > 0 else np.nan
+ridge_hit_train = directional_accuracy(y_train_delta_z, ridge_train_pred)
+ridge_hit_test = directional_accuracy(y_test_delta_z, ridge_test_pred) if len(X_test) > 0 else np.nan
 
 # Conditional accuracy when |z| > 1σ
-high_z_test = np.abs(z_test.values) > 1.0
-ridge_hit_high_z = conditional_accuracy(y_test_delta_z.values, ridge_test_pred, high_z_test) if len(X_test) > 0 else np.nan
+ridge_hit_high_z = conditional_accuracy(y_test_delta_z, ridge_test_pred, high_z_test) if len(X_test) > 0 else np.nan
 
 results_delta_z['ridge'] = {
     'name': 'Ridge',
@@ -227,20 +318,30 @@ scaler_delta_z = StandardScaler()
 X_train_scaled = scaler_delta_z.fit_transform(X_train)
 X_test_scaled = scaler_delta_z.transform(X_test) if len(X_test) > 0 else np.array([])
 
+# ElasticNet grid shared by the Δz and binary searches; with far more weeks
+# than features each fold's coordinate descent runs on a precomputed Gram
+ENET_ALPHAS = [0.001, 0.01, 0.1, 1]
+ENET_L1_RATIOS = [.1, .5, .7, .9, .95]
+
 enet_delta_z = ElasticNetCV(
-    alphas=[0.001, 0.01, 0.1, 1],
-    l1_ratio=[.1, .5, .7, .9, .95],
+    alphas=ENET_ALPHAS,
+    l1_ratio=ENET_L1_RATIOS,
     cv=5,
-    max_iter=5000
+    max_iter=5000,
+    precompute=True,
+    n_jobs=-1
 )
-enet_delta_z.fit(X_train_scaled, y_train_delta_z)
+# The (l1_ratio, fold) paths run one per core; single-threaded BLAS inside
+# each stops the workers oversubscribing the machine
+with threadpool_limits(limits=1, user_api='blas'):
+    enet_delta_z.fit(X_train_scaled, y_train_delta_z)
 
 enet_train_pred = enet_delta_z.predict(X_train_scaled)
 enet_test_pred = enet_delta_z.predict(X_test_scaled) if len(X_test) > 0 else np.array([])
 
-enet_hit_train = directional_accuracy(y_train_delta_z.values, enet_train_pred)
-enet_hit_test = directional_accuracy(y_test_delta_z.values, enet_test_pred) if len(X_test) > 0 else np.nan
-enet_hit_high_z = conditional_accuracy(y_test_delta_z.values, enet_test_pred, high_z_test) if len(X_test) > 0 else np.nan
+enet_hit_train = directional_accuracy(y_train_delta_z, enet_train_pred)
+enet_hit_test = directional_accuracy(y_test_delta_z, enet_test_pred) if len(X_test) > 0 else np.nan
+enet_hit_high_z = conditional_accuracy(y_test_delta_z, enet_test_pred, high_z_test) if len(X_test) > 0 else np.nan
 
 results_delta_z['elasticnet'] = {
     'name': 'ElasticNet',
@@ -263,24 +364,16 @@ print(f"  Hit rate (|z|>1σ): {enet_hit_high_z:.1%}" if len(X_test) > 0 else "")
 # -------------------------------------------------------------------------------
 print("\n[MODEL A3] XGBoost...")
 
-xgb_delta_z = XGBRegressor(
-    n_estimators=200,
-    learning_rate=0.05,
-    max_depth=3,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    reg_lambda=5.0,
-    reg_alpha=2.0,
-    random_state=42
-)
-xgb_delta_z.fit(X_train, y_train_delta_z, verbose=False)
+print(f"  Device: {xgb_device()}")
+xgb_delta_z = XGBRegressor(**XGB_PARAMS, device=xgb_device())
+xgb_delta_z.fit(X_train_f32, y_train_delta_z, verbose=False)
 
-xgb_train_pred = xgb_delta_z.predict(X_train)
-xgb_test_pred = xgb_delta_z.predict(X_test) if len(X_test) > 0 else np.array([])
+xgb_train_pred = xgb_delta_z.predict(X_train_f32)
+xgb_test_pred = xgb_delta_z.predict(X_test_f32) if len(X_test) > 0 else np.array([])
 
-xgb_hit_train = directional_accuracy(y_train_delta_z.values, xgb_train_pred)
-xgb_hit_test = directional_accuracy(y_test_delta_z.values, xgb_test_pred) if len(X_test) > 0 else np.nan
-xgb_hit_high_z = conditional_accuracy(y_test_delta_z.values, xgb_test_pred, high_z_test) if len(X_test) > 0 else np.nan
+xgb_hit_train = directional_accuracy(y_train_delta_z, xgb_train_pred)
+xgb_hit_test = directional_accuracy(y_test_delta_z, xgb_test_pred) if len(X_test) > 0 else np.nan
+xgb_hit_high_z = conditional_accuracy(y_test_delta_z, xgb_test_pred, high_z_test) if len(X_test) > 0 else np.nan
 
 results_delta_z['xgboost'] = {
     'name': 'XGBoost',
@@ -303,25 +396,16 @@ print(f"  Hit rate (|z|>1σ): {xgb_hit_high_z:.1%}" if len(X_test) > 0 else "")
 if LIGHTGBM_AVAILABLE:
     print("\n[MODEL A4] LightGBM...")
 
-    lgbm_delta_z = LGBMRegressor(
-        n_estimators=200,
-        learning_rate=0.05,
-        max_depth=3,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        reg_lambda=5.0,
-        reg_alpha=2.0,
-        random_state=42,
-        verbose=-1
-    )
-    lgbm_delta_z.fit(X_train, y_train_delta_z)
-
-    lgbm_train_pred = lgbm_delta_z.predict(X_train)
-    lgbm_test_pred = lgbm_delta_z.predict(X_test) if len(X_test) > 0 else np.array([])
-
-    lgbm_hit_train = directional_accuracy(y_train_delta_z.values, lgbm_train_pred)
-    lgbm_hit_test = directional_accuracy(y_test_delta_z.values, lgbm_test_pred) if len(X_test) > 0 else np.nan
-    lgbm_hit_high_z = conditional_accuracy(y_test_delta_z.values, lgbm_test_pred, high_z_test) if len(X_test) > 0 else np.nan
+    print(f"  Device: {lgbm_device()}")
+    lgbm_delta_z = LGBMRegressor(**LGBM_PARAMS, device_type=lgbm_device())
+    lgbm_delta_z.fit(X_train_f32, y_train_delta_z)
+
+    lgbm_train_pred = lgbm_delta_z.predict(X_train_f32)
+    lgbm_test_pred = lgbm_delta_z.predict(X_test_f32) if len(X_test) > 0 else np.array([])
+
+    lgbm_hit_train = directional_accuracy(y_train_delta_z, lgbm_train_pred)
+    lgbm_hit_test = directional_accuracy(y_test_delta_z, lgbm_test_pred) if len(X_test) > 0 else np.nan
+    lgbm_hit_high_z = conditional_accuracy(y_test_delta_z, lgbm_test_pred, high_z_test) if len(X_test) > 0 else np.nan
 
     results_delta_z['lightgbm'] = {
         'name': 'LightGBM',
@@ -366,7 +450,7 @@ ridge_bin_test_pred = (ridge_bin_test_prob > 0.5).astype(int) if len(X_test) > 0
 
 ridge_acc_train = accuracy_score(y_train_binary, ridge_bin_train_pred)
 ridge_acc_test = accuracy_score(y_test_binary, ridge_bin_test_pred) if len(X_test) > 0 else np.nan
-ridge_acc_high_z = accuracy_score(y_test_binary[high_z_test], ridge_bin_test_pred[high_z_test]) if (len(X_test) > 0 and high_z_test.sum() > 0) else np.nan
+ridge_acc_high_z = accuracy_score(y_test_binary_high_z, ridge_bin_test_pred[high_z_test]) if has_high_z_test else np.nan
 
 results_binary['ridge'] = {
     'name': 'Ridge',
@@ -379,20 +463,24 @@ results_binary['ridge'] = {
 
 print(f"  Accuracy train: {ridge_acc_train:.1%}")
 print(f"  Accuracy test:  {ridge_acc_test:.1%}" if len(X_test) > 0 else "")
-print(f"  Accuracy (|z|>1σ): {ridge_acc_high_z:.1%}" if (len(X_test) > 0 and high_z_test.sum() > 0) else "")
+print(f"  Accuracy (|z|>1σ): {ridge_acc_high_z:.1%}" if has_high_z_test else "")
 
 # -------------------------------------------------------------------------------
 # B2: ElasticNet (with threshold)
 # -------------------------------------------------------------------------------
 print("\n[MODEL B2] ElasticNet (with threshold)...")
 
+# Same grid and the same scaled matrix as A2 (scaler fitted once there)
 enet_binary = ElasticNetCV(
-    alphas=[0.001, 0.01, 0.1, 1],
-    l1_ratio=[.1, .5, .7, .9, .95],
+    alphas=ENET_ALPHAS,
+    l1_ratio=ENET_L1_RATIOS,
     cv=5,
-    max_iter=5000
+    max_iter=5000,
+    precompute=True,
+    n_jobs=-1
 )
-enet_binary.fit(X_train_scaled, y_train_binary)
+with threadpool_limits(limits=1, user_api='blas'):
+    enet_binary.fit(X_train_scaled, y_train_binary)
 
 enet_bin_train_prob = enet_binary.predict(X_train_scaled)
 enet_bin_train_pred = (enet_bin_train_prob > 0.5).astype(int)
@@ -401,7 +489,7 @@ enet_bin_test_pred = (enet_bin_test_prob > 0.5).astype(int) if len(X_test) > 0 e
 
 enet_acc_train = accuracy_score(y_train_binary, enet_bin_train_pred)
 enet_acc_test = accuracy_score(y_test_binary, enet_bin_test_pred) if len(X_test) > 0 else np.nan
-enet_acc_high_z = accuracy_score(y_test_binary[high_z_test], enet_bin_test_pred[high_z_test]) if (len(X_test) > 0 and high_z_test.sum() > 0) else np.nan
+enet_acc_high_z = accuracy_score(y_test_binary_high_z, enet_bin_test_pred[high_z_test]) if has_high_z_test else np.nan
 
 results_binary['elasticnet'] = {
     'name': 'ElasticNet',
@@ -415,32 +503,22 @@ results_binary['elasticnet'] = {
 
 print(f"  Accuracy train: {enet_acc_train:.1%}")
 print(f"  Accuracy test:  {enet_acc_test:.1%}" if len(X_test) > 0 else "")
-print(f"  Accuracy (|z|>1σ): {enet_acc_high_z:.1%}" if (len(X_test) > 0 and high_z_test.sum() > 0) else "")
+print(f"  Accuracy (|z|>1σ): {enet_acc_high_z:.1%}" if has_high_z_test else "")
 
 # -------------------------------------------------------------------------------
 # B3: XGBoost Classifier
 # -------------------------------------------------------------------------------
 print("\n[MODEL B3] XGBoost Classifier...")
 
-xgb_binary = XGBClassifier(
-    n_estimators=200,
-    learning_rate=0.05,
-    max_depth=3,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    reg_lambda=5.0,
-    reg_alpha=2.0,
-    random_state=42,
-    eval_metric='logloss'
-)
-xgb_binary.fit(X_train, y_train_binary, verbose=False)
+xgb_binary = XGBClassifier(**XGB_PARAMS, device=xgb_device(), eval_metric='logloss')
+xgb_binary.fit(X_train_f32, y_train_binary, verbose=False)
 
-xgb_bin_train_pred = xgb_binary.predict(X_train)
-xgb_bin_test_pred = xgb_binary.predict(X_test) if len(X_test) > 0 else np.array([])
+xgb_bin_train_pred = xgb_binary.predict(X_train_f32)
+xgb_bin_test_pred = xgb_binary.predict(X_test_f32) if len(X_test) > 0 else np.array([])
 
 xgb_acc_train = accuracy_score(y_train_binary, xgb_bin_train_pred)
 xgb_acc_test = accuracy_score(y_test_binary, xgb_bin_test_pred) if len(X_test) > 0 else np.nan
-xgb_acc_high_z = accuracy_score(y_test_binary[high_z_test], xgb_bin_test_pred[high_z_test]) if (len(X_test) > 0 and high_z_test.sum() > 0) else np.nan
+xgb_acc_high_z = accuracy_score(y_test_binary_high_z, xgb_bin_test_pred[high_z_test]) if has_high_z_test else np.nan
 
 results_binary['xgboost'] = {
     'name': 'XGBoost',
@@ -453,7 +531,7 @@ results_binary['xgboost'] = {
 
 print(f"  Accuracy train: {xgb_acc_train:.1%}")
 print(f"  Accuracy test:  {xgb_acc_test:.1%}" if len(X_test) > 0 else "")
-print(f"  Accuracy (|z|>1σ): {xgb_acc_high_z:.1%}" if (len(X_test) > 0 and high_z_test.sum() > 0) else "")
+print(f"  Accuracy (|z|>1σ): {xgb_acc_high_z:.1%}" if has_high_z_test else "")
 
 # -------------------------------------------------------------------------------
 # B4: LightGBM Classifier
@@ -461,25 +539,15 @@ print(f"  Accuracy (|z|>1σ): {xgb_acc_high_z:.1%}" if (len(X_test) > 0 and high
 if LIGHTGBM_AVAILABLE:
     print("\n[MODEL B4] LightGBM Classifier...")
 
-    lgbm_binary = LGBMClassifier(
-        n_estimators=200,
-        learning_rate=0.05,
-        max_depth=3,
-        subsample=0.8,
-        colsample_bytree=0.8,
-        reg_lambda=5.0,
-        reg_alpha=2.0,
-        random_state=42,
-        verbose=-1
-    )
-    lgbm_binary.fit(X_train, y_train_binary)
-
-    lgbm_bin_train_pred = lgbm_binary.predict(X_train)
-    lgbm_bin_test_pred = lgbm_binary.predict(X_test) if len(X_test) > 0 else np.array([])
+    lgbm_binary = LGBMClassifier(**LGBM_PARAMS, device_type=lgbm_device())
+    lgbm_binary.fit(X_train_f32, y_train_binary)
+
+    lgbm_bin_train_pred = lgbm_binary.predict(X_train_f32)
+    lgbm_bin_test_pred = lgbm_binary.predict(X_test_f32) if len(X_test) > 0 else np.array([])
 
     lgbm_acc_train = accuracy_score(y_train_binary, lgbm_bin_train_pred)
     lgbm_acc_test = accuracy_score(y_test_binary, lgbm_bin_test_pred) if len(X_test) > 0 else np.nan
-    lgbm_acc_high_z = accuracy_score(y_test_binary[high_z_test], lgbm_bin_test_pred[high_z_test]) if (len(X_test) > 0 and high_z_test.sum() > 0) else np.nan
+    lgbm_acc_high_z = accuracy_score(y_test_binary_high_z, lgbm_bin_test_pred[high_z_test]) if has_high_z_test else np.nan
 
     results_binary['lightgbm'] = {
         'name': 'LightGBM',
@@ -492,7 +560,7 @@ if LIGHTGBM_AVAILABLE:
 
     print(f"  Accuracy train: {lgbm_acc_train:.1%}")
     print(f"  Accuracy test:  {lgbm_acc_test:.1%}" if len(X_test) > 0 else "")
-    print(f"  Accuracy (|z|>1σ): {lgbm_acc_high_z:.1%}" if (len(X_test) > 0 and high_z_test.sum() > 0) else "")
+    print(f"  Accuracy (|z|>1σ): {lgbm_acc_high_z:.1%}" if has_high_z_test else "")
 else:
     print("\n[MODEL B4] LightGBM Classifier... SKIPPED (not installed)")
 
@@ -512,7 +580,7 @@ all_results = {
     'delta_z': results_delta_z,
     'binary': results_binary,
     'test_dates': test_df.index,
-    'test_z': z_test.values
+    'test_z': z_test
 }
 
 with open(output_dir / 'all_models.pkl', 'wb') as f:
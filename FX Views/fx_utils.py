@@ -0,0 +1,57 @@
+"""
+FX Views - shared helpers for the pipeline / model scripts
+(imported after putting the FX Views folder on sys.path)
+"""
+import json
+import math
+from pathlib import Path
+
+import numpy as np
+
+# Optional JIT for the numeric kernels (they run as plain Python without numba)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# Optional Rust JSON encoder for the summary dumps (stdlib json without it)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+def _json_ready(obj):
+    """obj with NumPy values as plain Python ones and NaN / ±inf as None"""
+    if isinstance(obj, dict):
+        return {key: _json_ready(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_json_ready(value) for value in obj]
+    if isinstance(obj, np.ndarray):
+        return _json_ready(obj.tolist())
+    if isinstance(obj, np.generic):
+        obj = obj.item()
+    if isinstance(obj, float) and not math.isfinite(obj):
+        return None
+    return obj
+
+def write_json(path, obj):
+    """
+    Write obj as 2-space indented JSON (orjson when installed)
+
+    Non-finite floats are written as null by both encoders, so the file reads
+    back the same whichever one ran.
+    """
+    obj = _json_ready(obj)
+    if ORJSON_AVAILABLE:
+        Path(path).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2, allow_nan=False)
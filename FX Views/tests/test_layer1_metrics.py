@@ -0,0 +1,55 @@
+"""
+Layer 1 metrics: the numba kernels and the NumPy fallbacks must agree
+(without numba installed the kernels run as plain Python, same logic)
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / '2_layer1_models'))
+from fx_layer1_metrics import (
+    _regime_stats_kernel, _regime_stats_numpy,
+    _stability_kernel, _stability_numpy,
+)
+
+RNG = np.random.default_rng(0)
+
+REGIME_CASES = {
+    'random': RNG.normal(scale=0.02, size=240),
+    'with_nan': np.array([0.005, np.nan, -0.03, 0.05, 0.0]),
+    'one_point': np.array([0.015]),
+    'two_points': np.array([-0.001, 0.045]),
+}
+
+STABILITY_CASES = {
+    'random': np.cumsum(RNG.normal(scale=0.01, size=240)) + 1.1,
+    'with_nan': np.array([1.10, 1.12, np.nan, 1.09, 1.11]),
+    'one_point': np.array([1.10]),
+    'two_points': np.array([1.10, 1.13]),
+    'three_points': np.array([1.10, 1.13, 1.12]),
+}
+
+@pytest.mark.parametrize('residuals', REGIME_CASES.values(), ids=REGIME_CASES.keys())
+def test_regime_stats_backends_match(residuals):
+    kernel = _regime_stats_kernel(residuals, 0.02)
+    fallback = _regime_stats_numpy(residuals, 0.02)
+    assert tuple(kernel[:3]) == tuple(fallback[:3])
+    np.testing.assert_allclose(kernel[3:], fallback[3:], rtol=1e-12, equal_nan=True)
+
+def test_regime_stats_nan_sits_in_no_regime():
+    in_line, stretch, break_regime, median_abs_z, max_abs_z = _regime_stats_kernel(REGIME_CASES['with_nan'], 0.02)
+    assert (in_line, stretch, break_regime) == (2, 1, 1)
+    assert np.isnan(median_abs_z) and np.isnan(max_abs_z)
+
+@pytest.mark.parametrize('fair_value', STABILITY_CASES.values(), ids=STABILITY_CASES.keys())
+def test_stability_backends_match(fair_value):
+    np.testing.assert_allclose(
+        _stability_kernel(fair_value), _stability_numpy(fair_value), rtol=1e-12, equal_nan=True)
+
+def test_stability_short_series_is_nan_not_an_error():
+    assert np.isnan(_stability_kernel(STABILITY_CASES['one_point'])).all()
+    fv_std, change_std, max_jump, mean_abs_change = _stability_kernel(STABILITY_CASES['two_points'])
+    assert np.isnan(change_std)
+    assert max_jump == pytest.approx(0.03) and mean_abs_change == pytest.approx(0.03)